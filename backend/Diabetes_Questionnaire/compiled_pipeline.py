@@ -0,0 +1,289 @@
+"""Single-record fast path for the fitted questionnaire pipeline.
+
+Most of the cost of one /predict call is building a 21-column DataFrame and running it
+through the ColumnTransformer, not the model itself. compile_pipeline() reads the fitted
+preprocessing once and turns it into:
+
+- column offsets for numeric answers, plus the scaler arithmetic to apply to them,
+- a category -> output offset lookup per one-hot column, and a category -> code lookup per
+  ordinal column.
+
+predict_one() fills a preallocated row from these tables and calls the final estimator
+directly. Only the steps listed here are supported: imputers, Standard/MinMax/Robust/
+MaxAbs scalers, one-hot and ordinal encoders, passthrough and drop. For any other pipeline
+shape compile_pipeline() returns None, and callers keep using pipeline.predict.
+check_parity() compares both paths over every category of every encoded column.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import (FunctionTransformer, MaxAbsScaler, MinMaxScaler, OneHotEncoder,
+                                   OrdinalEncoder, RobustScaler, StandardScaler)
+
+logger = logging.getLogger(__name__)
+
+# (column name, cast applied to the raw answer or None), as in main.FEATURES
+Features = Sequence[Tuple[str, Optional[Callable[[Any], Any]]]]
+# (numpy ufunc, values): applied in place to the selected outputs, in order
+Op = Tuple[Callable, np.ndarray]
+
+class UnsupportedPipeline(Exception):
+    pass
+
+def _is_identity(step: Any) -> bool:
+    if step is None or (isinstance(step, str) and step == "passthrough"):
+        return True
+    # Answers are validated as present, so an imputer never changes them
+    if isinstance(step, SimpleImputer) and not getattr(step, "add_indicator", False):
+        return True
+    return isinstance(step, FunctionTransformer) and step.func is None
+
+def _scaler_ops(scaler: Any) -> List[Op]:
+    """The same in-place arithmetic sklearn's transform() performs, so results match bit for bit"""
+    if isinstance(scaler, StandardScaler):
+        ops = [(np.subtract, scaler.mean_)] if scaler.with_mean else []
+        return ops + ([(np.divide, scaler.scale_)] if scaler.with_std else [])
+    if isinstance(scaler, MinMaxScaler):
+        if scaler.clip:
+            raise UnsupportedPipeline("MinMaxScaler(clip=True)")
+        return [(np.multiply, scaler.scale_), (np.add, scaler.min_)]
+    if isinstance(scaler, RobustScaler):
+        ops = [(np.subtract, scaler.center_)] if scaler.with_centering else []
+        return ops + ([(np.divide, scaler.scale_)] if scaler.with_scaling else [])
+    if isinstance(scaler, MaxAbsScaler):
+        return [(np.divide, scaler.scale_)]
+    raise UnsupportedPipeline(type(scaler).__name__)
+
+def _encoder_tables(encoder: Any) -> Tuple[str, List[Dict[Any, int]], Any, int]:
+    """(kind, per-column category -> index table, unknown handling, output width)"""
+    if getattr(encoder, "_infrequent_enabled", False):
+        raise UnsupportedPipeline("infrequent category grouping")
+    tables = [{category: i for i, category in enumerate(categories.tolist())} for categories in encoder.categories_]
+    if isinstance(encoder, OneHotEncoder):
+        if encoder.handle_unknown not in ("error", "ignore"):
+            raise UnsupportedPipeline(f"OneHotEncoder(handle_unknown={encoder.handle_unknown!r})")
+        drop_idx = encoder.drop_idx_ if encoder.drop_idx_ is not None else [None] * len(tables)
+        width = 0
+        for table, dropped in zip(tables, drop_idx):
+            # Output position within this column's block; the dropped category has none (-1)
+            for category, i in list(table.items()):
+                table[category] = -1 if dropped is not None and i == dropped else (
+                    i - (1 if dropped is not None and i > dropped else 0))
+            width += len(table) - (1 if dropped is not None else 0)
+        return "onehot", tables, encoder.handle_unknown, width
+    if isinstance(encoder, OrdinalEncoder):
+        unknown = encoder.unknown_value if encoder.handle_unknown == "use_encoded_value" else "error"
+        return "ordinal", tables, unknown, len(tables)
+    raise UnsupportedPipeline(type(encoder).__name__)
+
+class CompiledPipeline:
+    """Lookup tables and offsets replacing the fitted preprocessing for one record at a time"""
+
+    def __init__(self, estimator: Any, width: int, casts: Dict[str, Optional[Callable]]):
+        self.estimator = estimator
+        self.width = width
+        self.casts = casts
+        # (column, output offset) for numeric answers copied into the row
+        self.numeric: List[Tuple[str, int]] = []
+        # (output offsets, ops) scaling blocks, applied in order after numeric answers are set
+        self.ops: List[Tuple[np.ndarray, List[Op]]] = []
+        # ops of scalers between the ColumnTransformer and the estimator, applied to the whole row last
+        self.row_ops: List[Op] = []
+        # (column, base offset, category -> position, unknown handling)
+        self.onehot: List[Tuple[str, int, Dict[Any, int], Any]] = []
+        self.ordinal: List[Tuple[str, int, Dict[Any, int], Any]] = []
+        self.categories: Dict[str, List[Any]] = {}
+        self.numeric_scalers: Dict[str, List[Any]] = {}
+        self._local = threading.local()
+
+    def _row(self) -> np.ndarray:
+        # One preallocated (1, width) buffer per worker thread
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = self._local.row = np.zeros((1, self.width), dtype=np.float64)
+        return row
+
+    def _answer(self, record: Dict[str, Any], column: str) -> Any:
+        cast = self.casts.get(column)
+        return cast(record[column]) if cast is not None else record[column]
+
+    def transform_one(self, record: Dict[str, Any]) -> np.ndarray:
+        """The model input row for one record (a view of the thread's buffer)"""
+        row = self._row()
+        values = row[0]
+        values.fill(0.0)
+        for column, offset in self.numeric:
+            values[offset] = float(self._answer(record, column))
+        for offsets, ops in self.ops:
+            block = values[offsets]
+            for ufunc, operand in ops:
+                ufunc(block, operand, out=block)
+            values[offsets] = block
+        for column, offset, table, unknown in self.onehot:
+            value = self._answer(record, column)
+            if _is_missing(value):
+                raise ValueError(f"Missing answer for {column}")
+            position = table.get(value)
+            if position is None:
+                if unknown == "error":
+                    raise ValueError(f"Unknown category {value!r} for {column}")
+            elif position >= 0:
+                values[offset + position] = 1.0
+        for column, offset, table, unknown in self.ordinal:
+            value = self._answer(record, column)
+            if _is_missing(value):
+                raise ValueError(f"Missing answer for {column}")
+            code = table.get(value)
+            if code is None:
+                if unknown == "error":
+                    raise ValueError(f"Unknown category {value!r} for {column}")
+                code = unknown
+            values[offset] = code
+        for ufunc, operand in self.row_ops:
+            ufunc(values, operand, out=values)
+        return row
+
+    def predict_one(self, record: Dict[str, Any]) -> float:
+        return float(self.estimator.predict(self.transform_one(record))[0])
+
+def _is_missing(value: Any) -> bool:
+    # Missing values are their own category in sklearn's encoders; those records are left to the pipeline
+    return value is None or (isinstance(value, float) and value != value)
+
+def _column_names(columns: Any, feature_names: Sequence[str]) -> List[str]:
+    if isinstance(columns, str):
+        return [columns]
+    if isinstance(columns, slice):
+        return list(feature_names[columns])
+    columns = list(np.asarray(columns).tolist()) if not isinstance(columns, list) else columns
+    if columns and all(isinstance(c, bool) for c in columns):
+        return [name for name, keep in zip(feature_names, columns) if keep]
+    return [feature_names[c] if isinstance(c, int) else c for c in columns]
+
+def _compile(pipeline: Any, features: Features) -> CompiledPipeline:
+    if not isinstance(pipeline, Pipeline) or len(pipeline.steps) < 2:
+        raise UnsupportedPipeline("expected a Pipeline of a ColumnTransformer and an estimator")
+    preprocessor, estimator = pipeline.steps[0][1], pipeline.steps[-1][1]
+    if not isinstance(preprocessor, ColumnTransformer):
+        raise UnsupportedPipeline(f"first step is {type(preprocessor).__name__}")
+    if hasattr(estimator, "feature_names_in_"):
+        raise UnsupportedPipeline("estimator was fitted on named (pandas) features")
+
+    casts = dict(features)
+    feature_names = list(getattr(preprocessor, "feature_names_in_", [name for name, _ in features]))
+    compiled = CompiledPipeline(estimator, 0, casts)
+    offset = 0
+    for name, transformer, columns in preprocessor.transformers_:
+        names = _column_names(columns, feature_names)
+        if transformer == "drop" or not names:
+            continue
+        unknown_columns = [column for column in names if column not in casts]
+        if unknown_columns:
+            raise UnsupportedPipeline(f"{name} uses columns outside the questionnaire: {unknown_columns}")
+        steps = [step for _, step in transformer.steps] if isinstance(transformer, Pipeline) else [transformer]
+        steps = [step for step in steps if not _is_identity(step)]
+        encoders = [step for step in steps if isinstance(step, (OneHotEncoder, OrdinalEncoder))]
+
+        if not encoders:
+            ops = [op for step in steps for op in _scaler_ops(step)]
+            offsets = np.arange(offset, offset + len(names))
+            compiled.numeric.extend(zip(names, offsets.tolist()))
+            if ops:
+                compiled.ops.append((offsets, ops))
+            for index, column in enumerate(names):
+                compiled.numeric_scalers.setdefault(column, []).extend((step, index) for step in steps)
+            offset += len(names)
+            continue
+
+        if len(steps) != 1:
+            raise UnsupportedPipeline(f"{name} combines an encoder with other steps")
+        kind, tables, unknown, width = _encoder_tables(encoders[0])
+        block_offset = offset
+        for column, table in zip(names, tables):
+            compiled.categories[column] = list(table)
+            if kind == "onehot":
+                compiled.onehot.append((column, block_offset, table, unknown))
+                block_offset += sum(1 for position in table.values() if position >= 0)
+            else:
+                compiled.ordinal.append((column, block_offset, table, unknown))
+                block_offset += 1
+        offset += width
+
+    # Scalers between the ColumnTransformer and the estimator act on the whole row
+    for _, step in pipeline.steps[1:-1]:
+        if _is_identity(step):
+            continue
+        compiled.row_ops.extend(_scaler_ops(step))
+    compiled.width = offset
+    return compiled
+
+def compile_pipeline(pipeline: Any, features: Features) -> Optional[CompiledPipeline]:
+    """A CompiledPipeline for a supported pipeline shape, or None"""
+    try:
+        compiled = _compile(pipeline, features)
+    except (UnsupportedPipeline, AttributeError, TypeError) as e:
+        logger.info(f"Single-record fast path unavailable: {e}")
+        return None
+    logger.info(f"Compiled single-record fast path: {compiled.width} model inputs, "
+                f"{len(compiled.onehot) + len(compiled.ordinal)} encoded and {len(compiled.numeric)} numeric answers")
+    return compiled
+
+def _numeric_probes(compiled: CompiledPipeline, column: str) -> List[float]:
+    """Representative values for a numeric answer from the fitted scaler statistics"""
+    probes = []
+    for step, index in compiled.numeric_scalers.get(column, []):
+        if isinstance(step, StandardScaler) and step.with_mean:
+            center, spread = step.mean_[index], step.scale_[index]
+            probes += [center - 2 * spread, center - spread, center, center + spread, center + 2 * spread]
+        elif isinstance(step, MinMaxScaler):
+            low, high = step.data_min_[index], step.data_max_[index]
+            probes += [low, (low + high) / 2, high, high + (high - low) * 0.1]
+        elif isinstance(step, RobustScaler) and step.with_centering:
+            probes += [step.center_[index] + k * step.scale_[index] for k in (-2, -1, 0, 1, 2)]
+        elif isinstance(step, MaxAbsScaler):
+            probes += [-step.scale_[index], 0.0, step.scale_[index]]
+    return probes or [0.0, 1.0, 50.0, 100.0]
+
+def check_parity(compiled: CompiledPipeline, pipeline: Any, features: Features,
+                 samples: int = 200, seed: int = 0, tolerance: float = 1e-9) -> Dict[str, Any]:
+    """
+    Compare predict_one against pipeline.predict over the full category space.
+
+    Every category of every encoded column appears in at least one record (columns are
+    cycled together), numeric answers cycle through values around the fitted scaler
+    statistics, and `samples` more records combine answers at random.
+    """
+    rng = np.random.default_rng(seed)
+    columns = [name for name, _ in features]
+    casts = dict(features)
+    choices = {}
+    for column in columns:
+        if column in compiled.categories:
+            choices[column] = compiled.categories[column]
+        else:
+            probes = _numeric_probes(compiled, column)
+            choices[column] = [int(round(v)) if casts.get(column) is int else float(v) for v in probes]
+
+    cycled = max(len(values) for values in choices.values())
+    records = [{column: values[i % len(values)] for column, values in choices.items()} for i in range(cycled)]
+    records += [{column: values[rng.integers(len(values))] for column, values in choices.items()} for _ in range(samples)]
+
+    frame = pd.DataFrame([{column: compiled._answer(record, column) for column in columns} for record in records],
+                         columns=columns)
+    expected = np.asarray(pipeline.predict(frame), dtype=float)
+    actual = np.array([compiled.predict_one(record) for record in records])
+    differences = np.abs(actual - expected)
+    mismatches = np.flatnonzero(differences > tolerance)
+    return {
+        "ok": not len(mismatches),
+        "records": len(records),
+        "categories_covered": sum(len(values) for values in compiled.categories.values()),
+        "max_abs_difference": float(differences.max()) if len(differences) else 0.0,
+        "mismatches": [records[i] for i in mismatches[:5]]
+    }
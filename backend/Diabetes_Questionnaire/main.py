@@ -1,12 +1,85 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import pandas as pd
+import numpy as np
 import joblib
 import uvicorn
+import csv
+import io
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+
+from compiled_pipeline import compile_pipeline, check_parity
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # Load trained pipeline
 pipeline = joblib.load(r"C:\Users\Dell\Documents\GitHub\GlucoZap\backend\Diabetes_Questionnaire\diabetes_risk_model.pkl")
 
+# Model input columns, in training order, with the cast applied to numeric answers
+FEATURES = [
+    ("Age", None),
+    ("Gender", None),
+    ("Height", int),
+    ("Weight", int),
+    ("Waist Circumference", int),
+    ("Hip Circumference", int),
+    ("Family History", None),
+    ("Hypertension", None),
+    ("Heart Disease", None),
+    ("Smoking", None),
+    ("Physical Activity", None),
+    ("Diet", None),
+    ("Alcohol", None),
+    ("Sleep", None),
+    ("Stress", None),
+    ("Skin/Neck Features", None),
+    ("Foot Health", None),
+    ("Facial/Skin", None),
+    ("Breathing Patterns", None),
+    ("Blood Glucose", int),
+    ("HbA1c", float),
+]
+COLUMNS = [name for name, _ in FEATURES]
+NUMERIC_FEATURES = {name: cast for name, cast in FEATURES if cast is not None}
+SCORE_KEY = "Diabetes Risk Confidence Score"
+
+# Batch scoring configuration
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "2048"))
+BATCH_MAX_RECORDS = int(os.getenv("BATCH_MAX_RECORDS", "100000"))
+
+# Single-record fast path configuration
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") != "0"
+FAST_PATH_PARITY_SAMPLES = int(os.getenv("FAST_PATH_PARITY_SAMPLES", "200"))
+
+def load_fast_path():
+    """Compile the pipeline for single records and keep it only if it matches pipeline.predict"""
+    if not FAST_PATH_ENABLED:
+        return None, None
+    compiled = compile_pipeline(pipeline, FEATURES)
+    if compiled is None:
+        return None, None
+    try:
+        parity = check_parity(compiled, pipeline, FEATURES, samples=FAST_PATH_PARITY_SAMPLES)
+    except Exception as e:
+        logger.error(f"Fast path parity check failed to run: {e}")
+        return None, {"ok": False, "error": str(e)}
+    if not parity["ok"]:
+        logger.error(f"Fast path disabled, predictions differ from the pipeline: {parity['mismatches']}")
+        return None, parity
+    logger.info(f"✓ Fast path matches the pipeline on {parity['records']} records")
+    return compiled, parity
+
+fast_path, fast_path_parity = load_fast_path()
+
 app = FastAPI(title="Diabetes Risk Predictor API")
 
 # Enable CORS
@@ -20,6 +93,14 @@ app.add_middleware(
 
 @app.post("/predict")
 def predict(data: dict):
+    if fast_path is not None:
+        try:
+            return {SCORE_KEY: round(fast_path.predict_one(data), 2)}
+        except (KeyError, ValueError, TypeError):
+            pass  # missing answers, unknown categories etc. behave exactly as in the pipeline path below
+        except Exception:
+            logger.exception("Fast path failed, falling back to the pipeline")
+
     input_data = pd.DataFrame([{
         "Age": data["Age"],
         "Gender": data["Gender"],
@@ -47,6 +128,186 @@ def predict(data: dict):
     prediction = pipeline.predict(input_data)[0]
     return {"Diabetes Risk Confidence Score": round(float(prediction), 2)}
 
+def validate_frame(frame: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[int, str]]:
+    """
+    Check and cast a frame of raw answers column by column.
+
+    Returns the valid rows as model input (original positions kept in the index) and an
+    error message per invalid row position. Missing answers and non-numeric values in
+    numeric columns make a row invalid; extra columns are ignored.
+    """
+    frame = frame.reset_index(drop=True).reindex(columns=COLUMNS)
+    problems: Dict[int, List[str]] = {}
+    for column in COLUMNS:
+        missing = frame[column].isna()
+        invalid = pd.Series(False, index=frame.index)
+        if column in NUMERIC_FEATURES:
+            values = pd.to_numeric(frame[column], errors="coerce")
+            invalid = values.isna() & ~missing
+            frame[column] = values
+        for position in np.flatnonzero(missing.to_numpy()):
+            problems.setdefault(int(position), []).append(f"missing {column}")
+        for position in np.flatnonzero(invalid.to_numpy()):
+            problems.setdefault(int(position), []).append(f"invalid {column}")
+
+    valid = frame.drop(index=list(problems))
+    for column, cast in NUMERIC_FEATURES.items():
+        # Same truncation as int() in /predict
+        valid[column] = np.trunc(valid[column]).astype(np.int64) if cast is int else valid[column].astype(float)
+    return valid, {position: "; ".join(messages) for position, messages in problems.items()}
+
+def predict_rows(frame: pd.DataFrame) -> List[Tuple[Optional[float], Optional[str]]]:
+    """
+    (score, error) per row from one vectorized pipeline.predict call.
+
+    If the call fails (e.g. an unknown category), the frame is split in halves until the
+    failing rows are isolated, so only they get an error.
+    """
+    if frame.empty:
+        return []
+    try:
+        return [(round(float(score), 2), None) for score in pipeline.predict(frame)]
+    except Exception as e:
+        if len(frame) == 1:
+            return [(None, f"prediction failed: {e}")]
+        middle = len(frame) // 2
+        return predict_rows(frame.iloc[:middle]) + predict_rows(frame.iloc[middle:])
+
+def score_chunk(frame: pd.DataFrame, offset: int = 0) -> List[Dict[str, Any]]:
+    """Validate and score a chunk of raw records, returning one result per record in input order"""
+    valid, errors = validate_frame(frame)
+    results = [{"index": offset + position, "error": error} for position, error in errors.items()]
+    for position, (score, error) in zip(valid.index, predict_rows(valid)):
+        result = {"index": offset + int(position)}
+        if error is None:
+            result[SCORE_KEY] = score
+        else:
+            result["error"] = error
+        results.append(result)
+    return sorted(results, key=lambda result: result["index"])
+
+@app.post("/predict/batch")
+def predict_batch(data: dict):
+    """Score {"records": [...]} in chunks; a bad record gets an error entry instead of failing the batch"""
+    records = data.get("records")
+    if not isinstance(records, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON object with a 'records' list")
+    if len(records) > BATCH_MAX_RECORDS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_RECORDS} records per batch")
+
+    results = []
+    for offset in range(0, len(records), BATCH_CHUNK_SIZE):
+        chunk = records[offset:offset + BATCH_CHUNK_SIZE]
+        frame = pd.DataFrame([record if isinstance(record, dict) else {} for record in chunk], columns=COLUMNS)
+        for record, result in zip(chunk, score_chunk(frame, offset)):
+            if not isinstance(record, dict):
+                result["error"] = "record must be a JSON object"
+            results.append(result)
+
+    failed = sum(1 for result in results if "error" in result)
+    return {"count": len(results), "scored": len(results) - failed, "failed": failed, "results": results}
+
+def read_csv_rows(reader) -> Iterator[Tuple[Optional[List[str]], Optional[str]]]:
+    """(fields, None) per CSV record, or (None, error) for a record the csv module cannot parse; blank lines are skipped"""
+    while True:
+        try:
+            fields = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield None, f"malformed CSV line: {e}"
+            continue
+        if fields:
+            yield fields, None
+
+def csv_chunk_frame(header: List[str], rows: List[List[str]]) -> pd.DataFrame:
+    """Frame of string fields, typed like read_csv: empty cells are missing and all-numeric columns become numbers"""
+    frame = pd.DataFrame(rows, columns=header).replace("", np.nan)
+    for column in frame.columns:
+        values = pd.to_numeric(frame[column], errors="coerce")
+        if values.notna().sum() == frame[column].notna().sum():
+            frame[column] = values
+    return frame
+
+def stream_csv_scores(spooled, reader, header: List[str]):
+    """
+    CSV lines (header first) with the score or error of each input row, chunk by chunk.
+
+    A line with the wrong number of fields, or one the csv module cannot parse, gets an
+    error row of its own instead of ending the stream.
+    """
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["row", SCORE_KEY, "error"])
+        yield buffer.getvalue()
+        rows = read_csv_rows(reader)
+        row_number = 0
+        while True:
+            chunk = list(itertools.islice(rows, BATCH_CHUNK_SIZE))
+            if not chunk:
+                break
+            results: Dict[int, List[Any]] = {}
+            valid_rows, valid_numbers = [], []
+            for fields, error in chunk:
+                row_number += 1
+                if error is None and len(fields) != len(header):
+                    error = f"malformed CSV line: expected {len(header)} fields, got {len(fields)}"
+                if error is not None:
+                    results[row_number] = [row_number, "", error]
+                else:
+                    valid_rows.append(fields)
+                    valid_numbers.append(row_number)
+            if valid_rows:
+                for result in score_chunk(csv_chunk_frame(header, valid_rows)):
+                    number = valid_numbers[result["index"]]
+                    results[number] = [number, result.get(SCORE_KEY, ""), result.get("error", "")]
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(results[number] for number in sorted(results))
+            yield buffer.getvalue()
+    finally:
+        spooled.close()
+
+@app.post("/predict/batch/csv")
+def predict_batch_csv(file: UploadFile = File(...)):
+    """
+    Score a CSV of questionnaires (one column per answer, named as in /predict).
+
+    The result is streamed back as CSV in input order as each chunk is scored, with row
+    numbers counted from 1 after the header (blank lines are not counted).
+    """
+    # An anonymous temporary file is removed when closed or garbage collected, even if the
+    # client disconnects before the response body is iterated
+    spooled = tempfile.TemporaryFile()
+    shutil.copyfileobj(file.file, spooled)
+    spooled.seek(0)
+    reader = csv.reader(io.TextIOWrapper(spooled, encoding="utf-8-sig", errors="replace", newline=""), skipinitialspace=True)
+    try:
+        header = [name.strip() for name in next(reader)]
+    except (StopIteration, csv.Error) as e:
+        spooled.close()
+        raise HTTPException(status_code=400, detail=f"Could not read CSV header: {str(e) or 'empty file'}")
+    missing = [column for column in COLUMNS if column not in header]
+    if missing:
+        spooled.close()
+        raise HTTPException(status_code=400, detail=f"CSV is missing columns: {missing}")
+
+    return StreamingResponse(
+        stream_csv_scores(spooled, reader, header),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="diabetes_risk_scores.csv"'},
+        background=BackgroundTask(spooled.close)
+    )
+
+@app.get("/health")
+def health():
+    return {
+        "status": "healthy",
+        "fast_path": fast_path is not None,
+        "fast_path_parity": {k: v for k, v in fast_path_parity.items() if k != "mismatches"} if fast_path_parity else None
+    }
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="", port=8006, reload=True)
  
\ No newline at end of file
@@ -0,0 +1,139 @@
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import (MinMaxScaler, OneHotEncoder, OrdinalEncoder, PolynomialFeatures,
+                                   StandardScaler)
+
+from compiled_pipeline import check_parity, compile_pipeline
+
+# A small stand-in for the questionnaire: the committed model file is only an LFS pointer
+FEATURES = [
+    ("Age", None),
+    ("Gender", None),
+    ("Height", int),
+    ("Smoking", None),
+    ("Diet", None),
+    ("HbA1c", float),
+]
+NUMERIC = ["Age", "Height", "HbA1c"]
+CATEGORIES = {
+    "Gender": ["Male", "Female"],
+    "Smoking": ["Yes", "No", "Former"],
+    "Diet": ["Healthy", "Average", "Poor"],
+}
+NUMERIC_PROBES = {"Age": [25, 55], "Height": [150, 185], "HbA1c": [5.1, 8.4]}
+
+def training_frame(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "Age": rng.integers(20, 80, rows),
+        "Gender": rng.choice(CATEGORIES["Gender"], rows),
+        "Height": rng.integers(140, 200, rows),
+        "Smoking": rng.choice(CATEGORIES["Smoking"], rows),
+        "Diet": rng.choice(CATEGORIES["Diet"], rows),
+        "HbA1c": rng.uniform(4, 12, rows),
+    })
+    return frame, rng.uniform(0, 1, rows)
+
+def fitted(steps):
+    frame, target = training_frame()
+    return Pipeline(steps).fit(frame, target)
+
+PIPELINES = {
+    "onehot_forest": lambda: fitted([
+        ("pre", ColumnTransformer([("num", StandardScaler(), NUMERIC),
+                                   ("cat", OneHotEncoder(handle_unknown="ignore"), list(CATEGORIES))])),
+        ("model", RandomForestRegressor(n_estimators=10, random_state=0)),
+    ]),
+    "imputed_minmax_drop_first": lambda: fitted([
+        ("pre", ColumnTransformer([
+            ("num", Pipeline([("impute", SimpleImputer()), ("scale", MinMaxScaler())]), NUMERIC),
+            ("cat", Pipeline([("impute", SimpleImputer(strategy="most_frequent")),
+                              ("encode", OneHotEncoder(drop="first"))]), list(CATEGORIES)),
+        ])),
+        ("model", Ridge()),
+    ]),
+    "ordinal_passthrough_scaled": lambda: fitted([
+        ("pre", ColumnTransformer([("cat", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1),
+                                    list(CATEGORIES))], remainder="passthrough")),
+        ("scale", StandardScaler()),
+        ("model", Ridge()),
+    ]),
+}
+
+def category_grid():
+    """Every combination of every category, crossed with low and high numeric answers"""
+    columns = list(CATEGORIES) + NUMERIC
+    for combination in itertools.product(*(CATEGORIES[c] for c in CATEGORIES), *(NUMERIC_PROBES[c] for c in NUMERIC)):
+        yield dict(zip(columns, combination))
+
+def pipeline_prediction(pipeline, record):
+    frame = pd.DataFrame([record], columns=[name for name, _ in FEATURES])
+    return float(pipeline.predict(frame)[0])
+
+@pytest.fixture(params=list(PIPELINES), scope="module")
+def pipeline(request):
+    return PIPELINES[request.param]()
+
+@pytest.fixture(scope="module")
+def compiled(pipeline):
+    compiled = compile_pipeline(pipeline, FEATURES)
+    assert compiled is not None
+    return compiled
+
+def test_full_category_grid_matches_pipeline(pipeline, compiled):
+    records = list(category_grid())
+    expected = pipeline.predict(pd.DataFrame(records, columns=[name for name, _ in FEATURES]))
+    actual = np.array([compiled.predict_one(record) for record in records])
+    assert len(records) == 2 * 3 * 3 * 2 ** 3
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+
+def test_check_parity_reports_ok(pipeline, compiled):
+    parity = check_parity(compiled, pipeline, FEATURES, samples=50)
+    assert parity["ok"], parity["mismatches"]
+    assert parity["categories_covered"] == sum(len(values) for values in CATEGORIES.values())
+
+def test_numeric_answers_are_cast_like_predict(pipeline, compiled):
+    record = {"Age": 40, "Gender": "Female", "Height": "172", "Smoking": "No", "Diet": "Poor", "HbA1c": "6.3"}
+    cast = {**record, "Height": 172, "HbA1c": 6.3}
+    assert compiled.predict_one(record) == pytest.approx(pipeline_prediction(pipeline, cast), abs=1e-9)
+
+def test_unknown_category(pipeline, compiled):
+    record = {"Age": 40, "Gender": "Other", "Height": 170, "Smoking": "No", "Diet": "Poor", "HbA1c": 6.0}
+    try:
+        expected = pipeline_prediction(pipeline, record)
+    except ValueError:
+        # handle_unknown="error": both paths refuse the record
+        with pytest.raises(ValueError):
+            compiled.predict_one(record)
+    else:
+        assert compiled.predict_one(record) == pytest.approx(expected, abs=1e-9)
+
+@pytest.mark.parametrize("missing", [None, float("nan")])
+def test_missing_categorical_answer_is_left_to_the_pipeline(compiled, missing):
+    record = {"Age": 40, "Gender": missing, "Height": 170, "Smoking": "No", "Diet": "Poor", "HbA1c": 6.0}
+    with pytest.raises(ValueError):
+        compiled.predict_one(record)
+
+def test_absent_answer_raises_key_error(compiled):
+    with pytest.raises(KeyError):
+        compiled.predict_one({"Age": 40, "Gender": "Male"})
+
+def test_unsupported_pipeline_is_not_compiled():
+    pipeline = fitted([
+        ("pre", ColumnTransformer([("num", PolynomialFeatures(), NUMERIC),
+                                   ("cat", OneHotEncoder(), list(CATEGORIES))])),
+        ("model", Ridge()),
+    ])
+    assert compile_pipeline(pipeline, FEATURES) is None
@@ -1,5 +1,6 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 import cv2
 import mediapipe as mp
@@ -8,46 +9,112 @@ import parselmouth
 import librosa
 import math
 import os
+import threading
+import time
 from scipy.io.wavfile import write
 
+# Landmark metric engine, vendored from the desktop analyzer in ml/Face_Voice_Extract.
+import facial_metrics
+
+SESSION_IDLE_SECONDS = 120
+# Each tracking FaceMesh holds its own graph and buffers, so live sessions are capped
+MAX_SESSIONS = int(os.getenv("MAX_FACE_SESSIONS", "64"))
+# Accepted /stream_audio/ parameters; Praat needs a few pitch periods (75 Hz floor) per window
+MAX_SAMPLE_RATE = 192000
+MIN_WINDOW_SECONDS = 0.1
+MAX_WINDOW_SECONDS = 30.0
+# The final aggregate needs the whole recording, so a stream stops accepting audio past this length
+MAX_STREAM_SECONDS = float(os.getenv("MAX_STREAM_SECONDS", "600"))
+
+class TooManySessions(Exception):
+    pass
+
 app = FastAPI()
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 class DiabetesRiskAnalyzerAPI:
     def __init__(self):
         self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=1, refine_landmarks=True, min_detection_confidence=0.7, min_tracking_confidence=0.7)
+        # Sessionless frames are unrelated to each other, so they share one static-image instance.
+        self.face_mesh = self.create_face_mesh(static_image_mode=True)
+        self.face_mesh_lock = threading.Lock()
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
         self.mp_draw = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
 
+    def create_face_mesh(self, static_image_mode):
+        return self.mp_face_mesh.FaceMesh(static_image_mode=static_image_mode, max_num_faces=1, refine_landmarks=True, min_detection_confidence=0.7, min_tracking_confidence=0.7)
+
+    def session_face_mesh(self, session_id):
+        # Each streaming client gets its own tracking-mode FaceMesh so consecutive frames reuse the previous landmarks.
+        now = time.monotonic()
+        with self.sessions_lock:
+            self.evict_idle_sessions(now)
+            session = self.sessions.get(session_id)
+            if session is None:
+                if len(self.sessions) >= MAX_SESSIONS and not self.evict_least_recently_used():
+                    raise TooManySessions(f"All {MAX_SESSIONS} frame sessions are busy, try again later")
+                session = {"face_mesh": self.create_face_mesh(static_image_mode=False), "lock": threading.Lock(), "last_used": now}
+                self.sessions[session_id] = session
+            session["last_used"] = now
+            return session
+
+    def evict_idle_sessions(self, now):
+        for session_id, session in list(self.sessions.items()):
+            if now - session["last_used"] > SESSION_IDLE_SECONDS and session["lock"].acquire(blocking=False):
+                try:
+                    session["face_mesh"].close()
+                finally:
+                    session["lock"].release()
+                del self.sessions[session_id]
+
+    def evict_least_recently_used(self):
+        # Sessions mid-frame hold their lock and are skipped rather than closed under the caller
+        for session_id, session in sorted(self.sessions.items(), key=lambda item: item[1]["last_used"]):
+            if session["lock"].acquire(blocking=False):
+                try:
+                    session["face_mesh"].close()
+                finally:
+                    session["lock"].release()
+                del self.sessions[session_id]
+                return True
+        return False
+
+    def close_session(self, session_id):
+        with self.sessions_lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        with session["lock"]:
+            session["face_mesh"].close()
+        return True
+
+    def analyze_frame(self, frame_bytes, session_id=None):
+        frame = cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Could not decode image")
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if session_id:
+            session = self.session_face_mesh(session_id)
+            face_mesh, lock = session["face_mesh"], session["lock"]
+        else:
+            face_mesh, lock = self.face_mesh, self.face_mesh_lock
+        with lock:
+            results = face_mesh.process(rgb_frame)
+        if results.multi_face_landmarks:
+            return self.extract_facial_metrics(results.multi_face_landmarks[0])
+        return {}
+
     def extract_facial_metrics(self, landmarks):
-        h, w = 480, 640
-        points = [(int(landmark.x * w), int(landmark.y * h)) for landmark in landmarks.landmark]
-        left_eye = [points[33], points[160], points[158], points[133], points[153], points[144]]
-        right_eye = [points[362], points[385], points[387], points[263], points[373], points[380]]
-        def eye_aspect_ratio(eye_points):
-            A = math.dist(eye_points[1], eye_points[5])
-            B = math.dist(eye_points[2], eye_points[4])
-            C = math.dist(eye_points[0], eye_points[3])
-            return (A + B) / (2.0 * C)
-        left_ear = eye_aspect_ratio(left_eye)
-        right_ear = eye_aspect_ratio(right_eye)
-        mouth_points = [points[61], points[84], points[17], points[314], points[405], points[320], points[307], points[375]]
-        mouth_width = math.dist(mouth_points[0], mouth_points[4])
-        mouth_height = math.dist(mouth_points[2], mouth_points[6])
-        mouth_ratio = mouth_height / mouth_width if mouth_width > 0 else 0
-        nose_tip = points[1]
-        chin = points[18]
-        face_length = math.dist(nose_tip, chin)
-        left_cheek = points[116]
-        right_cheek = points[345]
-        face_width = math.dist(left_cheek, right_cheek)
-        face_ratio = face_length / face_width if face_width > 0 else 0
-        return {'avg_ear': (left_ear + right_ear)/2, 'mouth_ratio': mouth_ratio, 'face_ratio': face_ratio}
+        return facial_metrics.extract_facial_metrics(landmarks, names=('avg_ear', 'mouth_ratio', 'face_ratio'))
 
     def analyze_audio(self, file_path):
         y, sr = librosa.load(file_path, sr=None)
         snd = parselmouth.Sound(file_path)
+        return self.analyze_sound(snd)
+
+    def analyze_sound(self, snd):
         pitch = snd.to_pitch()
         mean_pitch = parselmouth.praat.call(pitch, "Get mean", 0, 0, "Hertz")
         point_process = parselmouth.praat.call(snd, "To PointProcess (periodic, cc)", 75, 600)
@@ -57,6 +124,77 @@ class DiabetesRiskAnalyzerAPI:
         hnr = parselmouth.praat.call(harmonicity, "Get mean", 0, 0)
         return {'pitch_mean': mean_pitch, 'jitter': jitter, 'shimmer': shimmer, 'hnr': hnr}
 
+class StreamingVoiceAnalyzer:
+    """Accumulates 16-bit mono PCM and computes voice features over sliding windows."""
+    def __init__(self, sample_rate=16000, window_seconds=1.0, hop_seconds=0.5):
+        if not 0 < sample_rate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"sample_rate must be between 1 and {MAX_SAMPLE_RATE}")
+        if not MIN_WINDOW_SECONDS <= window_seconds <= MAX_WINDOW_SECONDS:
+            raise ValueError(f"window_seconds must be between {MIN_WINDOW_SECONDS} and {MAX_WINDOW_SECONDS}")
+        if not 0 < hop_seconds <= window_seconds:
+            raise ValueError("hop_seconds must be positive and no longer than window_seconds")
+        self.sample_rate = sample_rate
+        self.window = int(window_seconds * sample_rate)
+        self.hop = int(hop_seconds * sample_rate)
+        # A hop under one sample would never advance ready_windows
+        if self.hop == 0:
+            raise ValueError("hop_seconds must be at least one sample long")
+        self.max_samples = int(MAX_STREAM_SECONDS * sample_rate)
+        self.samples = np.zeros(min(self.sample_rate * 30, self.max_samples), dtype=np.float64)
+        self.length = 0
+        self.next_window_start = 0
+        self.windows_analyzed = 0
+        self.pending = b""
+
+    def feed(self, chunk):
+        data = self.pending + chunk
+        usable = len(data) - len(data) % 2
+        self.pending = data[usable:]
+        if self.length + usable // 2 > self.max_samples:
+            raise ValueError(f"Stream exceeds the {MAX_STREAM_SECONDS:g} second limit")
+        values = np.frombuffer(data[:usable], dtype="<i2").astype(np.float64) / 32768.0
+        if self.length + len(values) > len(self.samples):
+            grown = np.zeros(min(max(len(self.samples) * 2, self.length + len(values)), self.max_samples), dtype=np.float64)
+            grown[:self.length] = self.samples[:self.length]
+            self.samples = grown
+        self.samples[self.length:self.length + len(values)] = values
+        self.length += len(values)
+
+    def ready_windows(self):
+        while self.next_window_start + self.window <= self.length:
+            start = self.next_window_start
+            self.next_window_start += self.hop
+            yield start, self.samples[start:start + self.window].copy()
+
+    def analyze_window(self, start, values):
+        self.windows_analyzed += 1
+        result = {
+            "type": "partial",
+            "window_start": start / self.sample_rate,
+            "window_end": (start + len(values)) / self.sample_rate,
+        }
+        try:
+            snd = parselmouth.Sound(values, sampling_frequency=self.sample_rate)
+            result["audio_features"] = json_safe_features(analyzer.analyze_sound(snd))
+        except Exception as e:
+            result["audio_features"] = {}
+            result["error"] = str(e)
+        return result
+
+    def finalize(self):
+        if self.length == 0:
+            return {"type": "final", "audio_features": {}, "duration": 0.0, "windows": self.windows_analyzed}
+        snd = parselmouth.Sound(self.samples[:self.length], sampling_frequency=self.sample_rate)
+        return {
+            "type": "final",
+            "audio_features": json_safe_features(analyzer.analyze_sound(snd)),
+            "duration": self.length / self.sample_rate,
+            "windows": self.windows_analyzed,
+        }
+
+def json_safe_features(features):
+    return {key: (None if value is None or math.isnan(value) else float(value)) for key, value in features.items()}
+
 analyzer = DiabetesRiskAnalyzerAPI()
 
 @app.post("/analyze_audio/")
@@ -68,19 +206,51 @@ async def analyze_audio_endpoint(file: UploadFile = File(...)):
     os.remove(file_path)
     return {"audio_features": features}
 
+@app.websocket("/stream_audio/")
+async def stream_audio_endpoint(websocket: WebSocket, sample_rate: int = 16000, window_seconds: float = 1.0, hop_seconds: float = 0.5):
+    # Binary messages carry 16-bit little-endian mono PCM; a text "end" message requests the final aggregate.
+    await websocket.accept()
+    try:
+        stream = StreamingVoiceAnalyzer(sample_rate, window_seconds, hop_seconds)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "error": str(e)})
+        await websocket.close(code=1008)
+        return
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                try:
+                    stream.feed(message["bytes"])
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "error": str(e)})
+                    await websocket.close(code=1009)
+                    return
+                for start, values in stream.ready_windows():
+                    await websocket.send_json(await run_in_threadpool(stream.analyze_window, start, values))
+            elif message.get("text") == "end":
+                await websocket.send_json(await run_in_threadpool(stream.finalize))
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+
 @app.post("/analyze_frame/")
-async def analyze_frame_endpoint(file: UploadFile = File(...)):
-    file_path = f"temp_{file.filename}"
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    frame = cv2.imdecode(np.fromfile(file_path, np.uint8), cv2.IMREAD_COLOR)
-    os.remove(file_path)
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = analyzer.face_mesh.process(rgb_frame)
-    metrics = {}
-    if results.multi_face_landmarks:
-        metrics = analyzer.extract_facial_metrics(results.multi_face_landmarks[0])
+async def analyze_frame_endpoint(file: UploadFile = File(...), session_id: str = None):
+    frame_bytes = await file.read()
+    try:
+        metrics = await run_in_threadpool(analyzer.analyze_frame, frame_bytes, session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TooManySessions as e:
+        raise HTTPException(status_code=503, detail=str(e))
     return {"facial_metrics": metrics}
 
+@app.delete("/analyze_frame/{session_id}")
+async def close_frame_session(session_id: str):
+    return {"session_id": session_id, "closed": await run_in_threadpool(analyzer.close_session, session_id)}
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="localhost", port=8000, reload=True)
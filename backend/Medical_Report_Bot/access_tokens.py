@@ -0,0 +1,79 @@
+"""Per-upload access tokens for analyzed documents.
+
+document_id is the SHA-256 of the uploaded file, so anyone holding the file can compute it.
+Every /analyze (or job) therefore issues a fresh random token, returned only in that
+response. Follow-up requests about the document (/ask, /images) must present it. Only a
+hash of each token is stored, and tokens expire after ACCESS_TOKEN_TTL_HOURS.
+"""
+import hashlib
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ACCESS_TOKEN_DB_PATH = os.getenv("ACCESS_TOKEN_DB_PATH", os.path.join("cache", "access_tokens.sqlite3"))
+ACCESS_TOKEN_TTL_HOURS = float(os.getenv("ACCESS_TOKEN_TTL_HOURS", "720"))
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+class AccessTokenStore:
+    """Maps hashed upload tokens to the document they grant access to"""
+
+    def __init__(self, path: str = ACCESS_TOKEN_DB_PATH, ttl_hours: float = ACCESS_TOKEN_TTL_HOURS):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            "token_hash TEXT PRIMARY KEY, document_id TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def issue(self, document_id: str) -> str:
+        """A new token for one upload of document_id"""
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM tokens WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "INSERT INTO tokens (token_hash, document_id, expires_at) VALUES (?, ?, ?)",
+                (_token_hash(token), document_id, now + self.ttl_seconds)
+            )
+            self._conn.commit()
+        return token
+
+    def resolve(self, token: Optional[str]) -> Optional[str]:
+        """The document_id a valid, unexpired token grants access to, else None"""
+        if not token or not isinstance(token, str):
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document_id FROM tokens WHERE token_hash = ? AND expires_at >= ?",
+                (_token_hash(token), time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def authorize(self, token: Optional[str], document_id: str) -> bool:
+        resolved = self.resolve(token)
+        return resolved is not None and secrets.compare_digest(resolved, document_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (active,) = self._conn.execute("SELECT COUNT(*) FROM tokens WHERE expires_at >= ?", (time.time(),)).fetchone()
+        return {"active_tokens": active, "ttl_hours": self.ttl_seconds / 3600}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
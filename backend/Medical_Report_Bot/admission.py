@@ -0,0 +1,162 @@
+"""Memory-aware admission control for document extraction.
+
+hi_res partitioning (layout detection, OCR, table structure) can use gigabytes per
+document. Each extraction first gets a memory cost estimated from its page count and file
+size. It is admitted only while the sum of admitted costs stays within
+ADMISSION_MEMORY_BUDGET_MB. Everything else waits in a strict FIFO queue, so a large
+document is never starved by a stream of small ones. A document costing more than the
+whole budget runs alone. Waiters are told their queue position as it changes, and
+operators get counters and the current queue from stats().
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Optional
+
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+def _default_budget_mb() -> int:
+    """Half of physical memory, or 4GB if it cannot be determined"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (2 * 1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 4096
+
+# Configuration
+ADMISSION_MEMORY_BUDGET_MB = int(os.getenv("ADMISSION_MEMORY_BUDGET_MB", str(_default_budget_mb())))
+ADMISSION_BASE_MB = int(os.getenv("ADMISSION_BASE_MB", "200"))
+ADMISSION_PAGE_MB = int(os.getenv("ADMISSION_PAGE_MB", "60"))
+ADMISSION_SIZE_FACTOR = float(os.getenv("ADMISSION_SIZE_FACTOR", "4"))
+
+def estimate_cost_mb(file_path: str) -> int:
+    """Memory estimate for extracting a document: a base cost, per PDF page, and per MB of file"""
+    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    pages = 0
+    if Path(file_path).suffix.lower() == ".pdf":
+        try:
+            pages = len(PdfReader(file_path).pages)
+        except Exception as e:
+            logger.warning(f"Could not count pages of {file_path}: {e}")
+            pages = 1
+    return int(ADMISSION_BASE_MB + pages * ADMISSION_PAGE_MB + size_mb * ADMISSION_SIZE_FACTOR)
+
+class _Ticket:
+    def __init__(self, cost_mb: int, label: str, on_position: Optional[Callable[[int], Any]]):
+        self.cost_mb = cost_mb
+        self.label = label
+        self.on_position = on_position
+        self.enqueued_at = time.monotonic()
+        self.granted = asyncio.get_running_loop().create_future()
+
+class AdmissionScheduler:
+    """FIFO admission of work against a memory budget"""
+
+    def __init__(self, budget_mb: int = ADMISSION_MEMORY_BUDGET_MB):
+        self.budget_mb = max(1, budget_mb)
+        self.in_use_mb = 0
+        self.running = 0
+        self._queue: Deque[_Ticket] = deque()
+        self._counters = {"admitted": 0, "queued": 0, "max_queue_depth": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def _dispatch(self):
+        moved = False
+        while self._queue:
+            ticket = self._queue[0]
+            if self.running and self.in_use_mb + ticket.cost_mb > self.budget_mb:
+                break
+            self._queue.popleft()
+            if ticket.granted.done():  # cancelled while waiting
+                continue
+            self.in_use_mb += ticket.cost_mb
+            self.running += 1
+            ticket.granted.set_result(None)
+            moved = True
+        if moved:
+            self._notify_positions()
+
+    def _notify_positions(self):
+        for position, ticket in enumerate(self._queue, start=1):
+            if ticket.on_position is not None:
+                try:
+                    ticket.on_position(position)
+                except Exception as e:
+                    logger.warning(f"Queue position callback failed: {e}")
+
+    def position(self, ticket: _Ticket) -> int:
+        """1-based queue position, 0 once admitted"""
+        try:
+            return self._queue.index(ticket) + 1
+        except ValueError:
+            return 0
+
+    @asynccontextmanager
+    async def admit(self, cost_mb: int, label: str = "",
+                    on_position: Optional[Callable[[int], Any]] = None):
+        """
+        Wait until cost_mb fits in the budget (FIFO), hold it for the block, then release it.
+
+        Yields a dict with cost_mb, queue_position (on arrival, 0 if admitted at once) and,
+        after admission, waited_seconds. on_position(n) is called when the position changes.
+        """
+        ticket = _Ticket(cost_mb, label, on_position)
+        self._queue.append(ticket)
+        self._dispatch()
+        info = {"cost_mb": cost_mb, "queue_position": self.position(ticket)}
+        if info["queue_position"]:
+            self._counters["queued"] += 1
+            self._counters["max_queue_depth"] = max(self._counters["max_queue_depth"], len(self._queue))
+            logger.info(f"Admission: {label} ({cost_mb}MB) queued at position {info['queue_position']}, "
+                        f"{self.in_use_mb}/{self.budget_mb}MB in use")
+            if on_position is not None:
+                on_position(info["queue_position"])
+
+        try:
+            await ticket.granted
+        except asyncio.CancelledError:
+            if ticket.granted.done() and not ticket.granted.cancelled():
+                self._release(ticket)
+            else:
+                ticket.granted.cancel()
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                self._dispatch()
+            raise
+
+        waited = time.monotonic() - ticket.enqueued_at
+        info["waited_seconds"] = round(waited, 3)
+        self._counters["admitted"] += 1
+        self._counters["wait_seconds"] += waited
+        self._counters["max_wait_seconds"] = max(self._counters["max_wait_seconds"], waited)
+        try:
+            yield info
+        finally:
+            self._release(ticket)
+
+    def _release(self, ticket: _Ticket):
+        self.in_use_mb -= ticket.cost_mb
+        self.running -= 1
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        admitted = self._counters["admitted"]
+        return {
+            "budget_mb": self.budget_mb,
+            "in_use_mb": self.in_use_mb,
+            "running": self.running,
+            "queue_depth": len(self._queue),
+            "queue": [
+                {"position": i, "label": t.label, "cost_mb": t.cost_mb, "waiting_seconds": round(time.monotonic() - t.enqueued_at, 1)}
+                for i, t in enumerate(self._queue, start=1)
+            ],
+            "admitted_total": admitted,
+            "queued_total": self._counters["queued"],
+            "max_queue_depth": self._counters["max_queue_depth"],
+            "avg_wait_seconds": round(self._counters["wait_seconds"] / admitted, 3) if admitted else 0.0,
+            "max_wait_seconds": round(self._counters["max_wait_seconds"], 3),
+        }
@@ -0,0 +1,117 @@
+"""Near-duplicate chunk detection before summarization.
+
+Multi-visit reports repeat headers, disclaimers and reference-range tables. Chunks are
+shingled into word trigrams and MinHashed. Locality-sensitive hashing over signature bands
+proposes candidate pairs, and pairs whose estimated Jaccard similarity reaches
+DEDUP_THRESHOLD are grouped together. Each group is summarized once.
+
+Only chunks of the same kind that contain exactly the same numbers can be grouped, so two
+copies of a lab table with different values always get their own summaries.
+"""
+import hashlib
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from summary_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") != "0"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+DEDUP_NUM_PERM = 64
+DEDUP_BANDS = 16
+SHINGLE_SIZE = 3
+
+_PRIME = np.uint64((1 << 61) - 1)
+_TOKEN = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+def minhash_signatures(texts: List[str], num_perm: int = DEDUP_NUM_PERM, seed: int = 1) -> np.ndarray:
+    """(len(texts), num_perm) MinHash signatures; texts without tokens get an all-max row"""
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, 2 ** 31 - 1, size=num_perm).astype(np.uint64)
+    b = rng.randint(0, 2 ** 31 - 1, size=num_perm).astype(np.uint64)
+    signatures = np.full((len(texts), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for row, text in enumerate(texts):
+        grams = shingles(text)
+        if not grams:
+            continue
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest(), "little") for gram in grams),
+            dtype=np.uint64, count=len(grams)
+        )
+        # 32-bit hashes times 31-bit coefficients stay below 2**63, so uint64 never overflows
+        signatures[row] = ((hashes[:, None] * a + b) % _PRIME).min(axis=0)
+    return signatures
+
+def group_near_duplicates(contents: List[str], kinds: Optional[List[str]] = None,
+                          threshold: float = DEDUP_THRESHOLD,
+                          num_perm: int = DEDUP_NUM_PERM, bands: int = DEDUP_BANDS) -> List[int]:
+    """
+    Map every chunk to the index of its group's representative (its lowest member index).
+
+    A chunk that is not a near-duplicate of an earlier one is its own representative.
+    """
+    representative = list(range(len(contents)))
+    if len(contents) < 2:
+        return representative
+    kinds = kinds or [""] * len(contents)
+
+    def find(i: int) -> int:
+        while representative[i] != i:
+            representative[i] = representative[representative[i]]
+            i = representative[i]
+        return i
+
+    def union(i: int, j: int):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            representative[max(root_i, root_j)] = min(root_i, root_j)
+
+    # Exact duplicates (after whitespace normalization) need no MinHash
+    partitions: Dict[str, List[int]] = {}
+    first_seen: Dict[str, int] = {}
+    for i, (content, kind) in enumerate(zip(contents, kinds)):
+        normalized = normalize_text(content)
+        exact_key = f"{kind}\x00{normalized}"
+        if exact_key in first_seen:
+            union(first_seen[exact_key], i)
+            continue
+        first_seen[exact_key] = i
+        partition = f"{kind}\x00{' '.join(_NUMBER.findall(normalized))}"
+        partitions.setdefault(partition, []).append(i)
+
+    rows = num_perm // bands
+    for members in partitions.values():
+        if len(members) < 2:
+            continue
+        signatures = minhash_signatures([contents[i] for i in members], num_perm)
+        candidates = set()
+        for band in range(bands):
+            buckets: Dict[bytes, List[int]] = {}
+            for position, signature in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+                buckets.setdefault(signature.tobytes(), []).append(position)
+            for bucket in buckets.values():
+                for x in range(len(bucket)):
+                    for y in range(x + 1, len(bucket)):
+                        candidates.add((bucket[x], bucket[y]))
+        for x, y in candidates:
+            if find(members[x]) != find(members[y]) and np.mean(signatures[x] == signatures[y]) >= threshold:
+                union(members[x], members[y])
+
+    groups = [find(i) for i in range(len(contents))]
+    duplicates = sum(1 for i, root in enumerate(groups) if root != i)
+    if duplicates:
+        logger.info(f"Deduplication: {duplicates} of {len(contents)} chunks are near-duplicates")
+    return groups
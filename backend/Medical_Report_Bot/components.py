@@ -0,0 +1,115 @@
+"""Lazily loaded heavy components.
+
+The LLM client, the sentence-transformers model, the Chroma store and the unstructured
+partitioners are only imported and constructed on first use. Pods that serve /health or
+/quick-extract therefore start at plain FastAPI cost. A component can also be loaded ahead
+of traffic with warm(). Every load is timed, and a failed load is remembered, so requests
+do not retry a broken component. Only an explicit warm() tries again.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class LazyComponent:
+    """A value built by loader() on first use"""
+
+    def __init__(self, name: str, loader: Callable[[], Any], closer: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.loader = loader
+        self.closer = closer
+        self.loaded = False
+        self.value = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            self.value = self.loader()
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Error initializing {self.name}: {e}")
+        else:
+            self.loaded = True
+            self.error = None
+            self.loaded_at = time.time()
+            logger.info(f"✓ {self.name} loaded in {time.perf_counter() - started:.2f}s")
+        self.load_seconds = round(time.perf_counter() - started, 3)
+
+    def get(self) -> Any:
+        """The component, loading it if needed; None if loading failed"""
+        if not self.loaded and self.error is None:
+            with self._lock:
+                if not self.loaded and self.error is None:
+                    self._load()
+        return self.value
+
+    def warm(self) -> Dict[str, Any]:
+        """Load now, retrying a previous failure"""
+        with self._lock:
+            if not self.loaded:
+                self.error = None
+                self._load()
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "error": self.error
+        }
+
+    def close(self):
+        with self._lock:
+            if self.loaded and self.closer is not None:
+                try:
+                    self.closer(self.value)
+                except Exception as e:
+                    logger.error(f"Error closing {self.name}: {e}")
+            self.loaded, self.value = False, None
+
+class ComponentRegistry:
+    """Named lazy components, warmed and reported in registration order"""
+
+    def __init__(self):
+        self._components: Dict[str, LazyComponent] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], closer: Optional[Callable[[Any], None]] = None):
+        self._components[name] = LazyComponent(name, loader, closer)
+
+    def get(self, name: str) -> Any:
+        return self._components[name].get()
+
+    def require(self, name: str) -> Any:
+        """Like get, but raises RuntimeError when the component is unavailable"""
+        component = self._components[name]
+        value = component.get()
+        if not component.loaded:
+            raise RuntimeError(f"{name} unavailable: {component.error}")
+        return value
+
+    def is_loaded(self, name: str) -> bool:
+        return self._components[name].loaded
+
+    def names(self):
+        return list(self._components)
+
+    def warm(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        names = list(names) if names is not None else self.names()
+        unknown = [name for name in names if name not in self._components]
+        if unknown:
+            raise KeyError(f"Unknown components: {unknown}")
+        return {name: self._components[name].warm() for name in self.names() if name in names}
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: component.status() for name, component in self._components.items()}
+
+    def close_all(self):
+        for component in reversed(list(self._components.values())):
+            component.close()
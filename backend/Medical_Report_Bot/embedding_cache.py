@@ -0,0 +1,204 @@
+"""Batched, disk-cached embeddings for the Q&A index.
+
+Wraps the MiniLM sentence-transformers encoder so that every text is embedded at most
+once. Vectors live in a memory-mapped float32 file (one row per text) and a SQLite table
+maps the SHA-256 of the normalized text and model name to its row. Repeated headers,
+disclaimers and re-analyzed reports are served from the file. Only misses reach the
+encoder, EMBEDDING_BATCH_SIZE texts at a time. Embedding is the CPU bottleneck of
+ingestion, so throughput is tracked and reported.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:
+    from langchain.embeddings.base import Embeddings
+
+from summary_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join("cache", "embeddings"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+INITIAL_CAPACITY = 1024
+
+def embedding_key(text: str, model_name: str) -> str:
+    digest = hashlib.sha256()
+    for part in (normalize_text(text), model_name):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with batching and a persistent vector cache"""
+
+    def __init__(self, base: Embeddings, model_name: str, cache_dir: str = EMBEDDING_CACHE_DIR,
+                 batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.base = base
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.vectors_path = os.path.join(cache_dir, "vectors.f32")
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._counters = {"texts": 0, "cache_hits": 0, "embedded": 0, "embed_seconds": 0.0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+        meta = dict(self._conn.execute("SELECT name, value FROM meta").fetchall())
+        self.dim = meta.get("dim")
+        self.rows = meta.get("rows", 0)
+        if self.dim:
+            self._open(max(INITIAL_CAPACITY, self.rows))
+
+    def _open(self, capacity: int):
+        """Map the vector file with room for capacity rows, growing the file if needed"""
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        needed = capacity * self.dim * 4
+        if not os.path.exists(self.vectors_path) or os.path.getsize(self.vectors_path) < needed:
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(needed)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _store(self, keys: List[str], vectors: np.ndarray):
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._open(INITIAL_CAPACITY)
+        if self.rows + len(keys) > self._vectors.shape[0]:
+            capacity = self._vectors.shape[0]
+            while capacity < self.rows + len(keys):
+                capacity *= 2
+            self._open(capacity)
+
+        start = self.rows
+        self._vectors[start:start + len(keys)] = vectors
+        self._vectors.flush()
+        self.rows += len(keys)
+        # Rows are only referenced once their vectors are on disk
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO vectors (key, row) VALUES (?, ?)",
+            [(key, start + i) for i, key in enumerate(keys)]
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", [("dim", self.dim), ("rows", self.rows)]
+        )
+        self._conn.commit()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, int]:
+        found = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self._conn.execute(
+                f"SELECT key, row FROM vectors WHERE key IN ({placeholders})", batch
+            ).fetchall())
+        return found
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reading cached vectors and encoding the misses in batches"""
+        if not texts:
+            return []
+        keys = [embedding_key(text, self.model_name) for text in texts]
+        unique = list(dict.fromkeys(keys))
+
+        with self._lock:
+            rows = self._lookup(unique)
+            misses = [key for key in unique if key not in rows]
+            miss_texts = {}
+            for key, text in zip(keys, texts):
+                if key not in rows and key not in miss_texts:
+                    miss_texts[key] = text
+
+            started = time.perf_counter()
+            for start in range(0, len(misses), self.batch_size):
+                batch = misses[start:start + self.batch_size]
+                vectors = np.asarray(self.base.embed_documents([miss_texts[key] for key in batch]), dtype=np.float32)
+                self._store(batch, vectors)
+            seconds = time.perf_counter() - started
+            if misses:
+                rows = self._lookup(unique)
+
+            result = np.asarray(self._vectors[[rows[key] for key in keys]])
+            self._counters["texts"] += len(texts)
+            self._counters["cache_hits"] += len(texts) - len(misses)
+            self._counters["embedded"] += len(misses)
+            self._counters["embed_seconds"] += seconds
+
+        if misses:
+            logger.info(
+                f"Embedded {len(misses)} texts in {seconds:.2f}s ({len(misses) / max(seconds, 1e-9):.1f} texts/s), "
+                f"{len(texts) - len(misses)} served from cache"
+            )
+        return result.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            rows = self.rows
+        seconds = counters["embed_seconds"]
+        return {
+            "cached_vectors": rows,
+            "dim": self.dim,
+            "batch_size": self.batch_size,
+            "texts_requested": counters["texts"],
+            "cache_hits": counters["cache_hits"],
+            "texts_embedded": counters["embedded"],
+            "embed_seconds": round(seconds, 3),
+            "texts_per_second": round(counters["embedded"] / seconds, 1) if seconds else None
+        }
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            self._conn.close()
+
+def benchmark(texts: int = 512, batch_sizes=(1, 8, 32, 64)):
+    """Measure MiniLM throughput per batch size and the cost of a fully cached pass"""
+    import tempfile
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    model = "sentence-transformers/all-MiniLM-L6-v2"
+    contents = [f"Section {i}: HbA1c {5 + i % 40 / 10:.1f}% fasting glucose {90 + i % 60} mg/dL" for i in range(texts)]
+    for batch_size in batch_sizes:
+        base = HuggingFaceEmbeddings(
+            model_name=model,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={"normalize_embeddings": True, "batch_size": batch_size}
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            cached = CachedEmbeddings(base, model, directory, batch_size)
+            cached.embed_documents(contents)
+            cold = cached.stats()
+            started = time.perf_counter()
+            cached.embed_documents(contents)
+            warm = time.perf_counter() - started
+            cached.close()
+        print(f"batch {batch_size:3d}: {cold['texts_per_second']:8.1f} texts/s cold, "
+              f"{texts / warm:10.1f} texts/s from cache")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched and cached MiniLM embedding")
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64])
+    args = parser.parse_args()
+    benchmark(args.texts, args.batch_sizes)
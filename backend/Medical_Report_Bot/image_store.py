@@ -0,0 +1,120 @@
+"""On-disk store for images extracted from analyzed documents.
+
+Responses reference images by URL instead of embedding their base64 (previously twice per
+image). Each document's images are decoded once into IMAGE_STORE_DIR/<document_id>/ and
+served by /images/<access_token>/<image_id>, so only holders of an upload's access token
+can fetch them. When the store grows past IMAGE_STORE_MAX_MB,
+the least recently written documents are removed.
+"""
+import base64
+import logging
+import os
+import re
+import shutil
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join("cache", "images"))
+IMAGE_STORE_MAX_MB = int(os.getenv("IMAGE_STORE_MAX_MB", "500"))
+
+_DOCUMENT_ID = re.compile(r"^[0-9a-f]{16,64}$")
+_SIGNATURES = [
+    (b"\x89PNG", "image/png", ".png"),
+    (b"\xff\xd8", "image/jpeg", ".jpg"),
+    (b"GIF8", "image/gif", ".gif"),
+    (b"BM", "image/bmp", ".bmp"),
+    (b"II*\x00", "image/tiff", ".tif"),
+    (b"MM\x00*", "image/tiff", ".tif"),
+]
+
+def sniff_image_type(data: bytes) -> Tuple[str, str]:
+    """(mime type, file extension) from the leading bytes"""
+    for signature, mime, extension in _SIGNATURES:
+        if data.startswith(signature):
+            return mime, extension
+    return "application/octet-stream", ".bin"
+
+class ImageStore:
+    """Extracted images on disk, grouped per document"""
+
+    def __init__(self, directory: str = IMAGE_STORE_DIR, max_mb: int = IMAGE_STORE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, document_id: str, images_base64: List[str], access_token: str) -> List[Dict[str, Any]]:
+        """Decode and store a document's images, returning one reference per image (URLs carry access_token)"""
+        if not images_base64:
+            return []
+        document_dir = os.path.join(self.directory, document_id)
+        refs = []
+        with self._lock:
+            os.makedirs(document_dir, exist_ok=True)
+            for image_id, image_base64 in enumerate(images_base64, start=1):
+                try:
+                    data = base64.b64decode(image_base64)
+                except (ValueError, TypeError) as e:
+                    logger.error(f"Could not decode image {image_id}: {e}")
+                    refs.append({"image_id": image_id, "error": "invalid image data"})
+                    continue
+                mime, extension = sniff_image_type(data)
+                with open(os.path.join(document_dir, f"{image_id}{extension}"), "wb") as f:
+                    f.write(data)
+                refs.append({
+                    "image_id": image_id,
+                    "url": f"/images/{access_token}/{image_id}",
+                    "mime_type": mime,
+                    "size_bytes": len(data)
+                })
+            self._evict(keep=document_id)
+        return refs
+
+    def path(self, document_id: str, image_id: int) -> Optional[Tuple[str, str]]:
+        """(file path, mime type) of a stored image, or None"""
+        if not _DOCUMENT_ID.match(document_id):
+            return None
+        document_dir = os.path.join(self.directory, document_id)
+        if not os.path.isdir(document_dir):
+            return None
+        prefix = f"{image_id}."
+        for name in os.listdir(document_dir):
+            if name.startswith(prefix):
+                extension = os.path.splitext(name)[1]
+                mime = next((m for _, m, e in _SIGNATURES if e == extension), "application/octet-stream")
+                return os.path.join(document_dir, name), mime
+        return None
+
+    def _usage(self) -> List[Tuple[float, int, str]]:
+        usage = []
+        for name in os.listdir(self.directory):
+            document_dir = os.path.join(self.directory, name)
+            if not os.path.isdir(document_dir):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(document_dir) if entry.is_file())
+            usage.append((os.path.getmtime(document_dir), size, document_dir))
+        return usage
+
+    def _evict(self, keep: str):
+        usage = sorted(self._usage())
+        total = sum(size for _, size, _ in usage)
+        for _, size, document_dir in usage:
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(document_dir) == keep:
+                continue
+            shutil.rmtree(document_dir, ignore_errors=True)
+            total -= size
+            logger.info(f"Image store evicted {document_dir}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            usage = self._usage()
+        return {
+            "documents": len(usage),
+            "size_mb": round(sum(size for _, size, _ in usage) / (1024 * 1024), 2),
+            "max_mb": self.max_bytes // (1024 * 1024)
+        }
@@ -0,0 +1,156 @@
+"""Background document-analysis jobs with progress events.
+
+A submitted document becomes a Job that runs in the background, at most JOB_MAX_WORKERS
+at a time. Work reports progress by publishing events to its job; clients follow them as
+Server-Sent Events and can resume with Last-Event-ID. Finished jobs keep their result
+until JOB_TTL_SECONDS after completion.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "2"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+SSE_KEEPALIVE_SECONDS = 15
+
+TERMINAL_STATES = ("completed", "failed")
+
+class Job:
+    """State, event log and result of one analysis job"""
+
+    def __init__(self, filename: str):
+        self.id = str(uuid.uuid4())
+        self.filename = filename
+        self.status = "queued"
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.queue_position: Optional[int] = None  # position in the extraction admission queue
+        self._closed = False  # set once the terminal status event is in the log
+        self._changed = asyncio.Condition()
+        self._loop = asyncio.get_running_loop()
+
+    async def publish(self, event_type: str, data: Dict[str, Any]):
+        async with self._changed:
+            self.events.append({"id": len(self.events), "event": event_type, "data": data})
+            if event_type == "status" and data.get("status") in TERMINAL_STATES:
+                self._closed = True
+            self._changed.notify_all()
+
+    def publish_threadsafe(self, event_type: str, data: Dict[str, Any]):
+        """Publish from a worker thread (e.g. document partitioning)"""
+        asyncio.run_coroutine_threadsafe(self.publish(event_type, data), self._loop)
+
+    def progress_callback(self) -> Callable[[Dict[str, Any]], None]:
+        """Callback for synchronous code running in a worker thread"""
+        return lambda event: self.publish_threadsafe(event.pop("event", "progress"), event)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.finished_at + JOB_TTL_SECONDS if self.finished_at else None,
+            "events": len(self.events),
+            "queue_position": self.queue_position,
+            "error": self.error
+        }
+
+    async def stream(self, last_event_id: int = -1) -> AsyncIterator[str]:
+        """Yield Server-Sent Events after last_event_id until the job finishes"""
+        position = last_event_id + 1
+        while True:
+            async with self._changed:
+                if position >= len(self.events) and not self._closed:
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout=SSE_KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                pending = self.events[position:]
+                finished = self._closed
+
+            if not pending and not finished:
+                yield ": keepalive\n\n"
+                continue
+            for event in pending:
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            position += len(pending)
+            if finished and position >= len(self.events):
+                return
+
+class JobManager:
+    """Runs jobs in the background with bounded concurrency and expires finished ones"""
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS, ttl_seconds: int = JOB_TTL_SECONDS):
+        self.max_workers = max_workers
+        self.ttl_seconds = ttl_seconds
+        self.jobs: Dict[str, Job] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+
+    def submit(self, filename: str, work: Callable[[Job], Awaitable[Dict[str, Any]]],
+               cleanup: Optional[Callable[[], None]] = None) -> Job:
+        """Create a job and schedule work(job) in the background; returns immediately"""
+        self.purge_expired()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(1, self.max_workers))
+
+        job = Job(filename)
+        self.jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, work, cleanup))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job, work, cleanup):
+        try:
+            await job.publish("status", {"status": "queued"})
+            async with self._slots:
+                job.status = "running"
+                await job.publish("status", {"status": "running"})
+                job.result = await work(job)
+                job.status = "completed"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            await job.publish("status", {"status": job.status, "error": job.error})
+            if cleanup:
+                cleanup()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.purge_expired()
+        return self.jobs.get(job_id)
+
+    def purge_expired(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"max_workers": self.max_workers, "ttl_seconds": self.ttl_seconds, "jobs": counts}
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
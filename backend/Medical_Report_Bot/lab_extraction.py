@@ -0,0 +1,259 @@
+"""Structured lab values and medical terms without the LLM.
+
+All analyte names and synonyms are compiled into one alternation followed by unit-aware
+value and reference-range patterns, so a single regex pass over a chunk finds every
+HbA1c, glucose (fasting, random or unspecified), LDL, HDL, triglyceride and creatinine
+result. Ratios such as "LDL/HDL ratio" or "Total Cholesterol/HDL Ratio" are not values of
+either analyte and are skipped, as are urine glucose results. Table HTML
+is flattened to one "cell | cell" line per row first, so table rows match the same way.
+
+Values are also converted to one canonical unit per analyte. Each value is flagged
+against the report's own reference range, or, when the report has none, against common
+clinical cut-offs.
+"""
+import html
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+# analyte -> display name, synonyms, canonical unit and unit conversions to it
+ANALYTES = {
+    "hba1c": {
+        "name": "HbA1c",
+        "synonyms": ["hba1c", "hb a1c", "a1c", "glycated haemoglobin", "glycated hemoglobin",
+                     "glycosylated haemoglobin", "glycosylated hemoglobin", "haemoglobin a1c", "hemoglobin a1c"],
+        "unit": "%",
+        "convert": {"%": lambda v: v, "mmol/mol": lambda v: v / 10.929 + 2.15},
+    },
+    "fasting_glucose": {
+        "name": "Fasting glucose",
+        "synonyms": ["fasting blood glucose", "fasting plasma glucose", "fasting glucose", "fasting blood sugar",
+                     "glucose fasting", "glucose, fasting", "glucose - fasting", "glucose (fasting)", "glucose(fasting)",
+                     "blood glucose fasting", "blood glucose, fasting", "blood glucose (fasting)", "plasma glucose fasting",
+                     "plasma glucose, fasting", "plasma glucose (fasting)", "blood sugar fasting", "blood sugar, fasting",
+                     "blood sugar (fasting)", "fbs", "fpg", "fbg"],
+        "unit": "mg/dL",
+        "convert": {"mg/dl": lambda v: v, "mmol/l": lambda v: v * 18.016},
+    },
+    "random_glucose": {
+        "name": "Random glucose",
+        "synonyms": ["random blood glucose", "random plasma glucose", "random glucose", "random blood sugar",
+                     "glucose random", "glucose, random", "glucose - random", "glucose (random)", "glucose(random)",
+                     "blood glucose random", "blood glucose, random", "blood glucose (random)", "blood sugar random",
+                     "blood sugar, random", "blood sugar (random)",
+                     "rbs", "rbg"],
+        "unit": "mg/dL",
+        "convert": {"mg/dl": lambda v: v, "mmol/l": lambda v: v * 18.016},
+    },
+    "glucose": {
+        # Glucose without a stated fasting/random condition
+        "name": "Blood glucose",
+        "synonyms": ["blood glucose", "plasma glucose", "serum glucose", "blood sugar", "glucose"],
+        "unit": "mg/dL",
+        "convert": {"mg/dl": lambda v: v, "mmol/l": lambda v: v * 18.016},
+    },
+    "ldl": {
+        "name": "LDL cholesterol",
+        "synonyms": ["ldl cholesterol", "ldl-cholesterol", "ldl-c", "ldl", "low density lipoprotein", "ldl direct"],
+        "unit": "mg/dL",
+        "convert": {"mg/dl": lambda v: v, "mmol/l": lambda v: v * 38.67},
+    },
+    "hdl": {
+        "name": "HDL cholesterol",
+        "synonyms": ["hdl cholesterol", "hdl-cholesterol", "hdl-c", "hdl", "high density lipoprotein"],
+        "unit": "mg/dL",
+        "convert": {"mg/dl": lambda v: v, "mmol/l": lambda v: v * 38.67},
+    },
+    "triglycerides": {
+        "name": "Triglycerides",
+        "synonyms": ["triglycerides", "triglyceride", "triglycerids", "tg"],
+        "unit": "mg/dL",
+        "convert": {"mg/dl": lambda v: v, "mmol/l": lambda v: v * 88.57},
+    },
+    "creatinine": {
+        "name": "Creatinine",
+        "synonyms": ["serum creatinine", "creatinine, serum", "creatinine serum", "s. creatinine", "creatinine"],
+        "unit": "mg/dL",
+        "convert": {"mg/dl": lambda v: v, "umol/l": lambda v: v / 88.4},
+    },
+}
+
+# Common cut-offs used when the report gives no reference range: (low, high) in the canonical unit
+DEFAULT_RANGES = {
+    "hba1c": (None, 5.7),
+    "fasting_glucose": (70, 100),
+    "random_glucose": (70, 140),
+    "glucose": (70, 140),
+    "ldl": (None, 100),
+    "hdl": (40, None),
+    "triglycerides": (None, 150),
+    "creatinine": (0.6, 1.3),
+}
+
+MEDICAL_KEYWORDS = [
+    "diagnosis", "treatment", "medication", "prescription", "symptom",
+    "condition", "disease", "therapy", "surgery", "procedure",
+    "test", "lab", "blood", "urine", "x-ray", "ct", "mri",
+    "patient", "doctor", "physician", "hospital", "clinic"
+]
+
+UNIT_DISPLAY = {"%": "%", "mg/dl": "mg/dL", "mmol/mol": "mmol/mol", "mmol/l": "mmol/L", "umol/l": "µmol/L"}
+
+_SYNONYM_TO_ANALYTE = {synonym: key for key, analyte in ANALYTES.items() for synonym in analyte["synonyms"]}
+
+def _alternation(words: Iterable[str]) -> str:
+    # Longest first so "fasting blood glucose" wins over shorter overlapping names
+    return "|".join(re.escape(word).replace(r"\ ", r"\s+") for word in sorted(words, key=len, reverse=True))
+
+# "1,200" and "1,250.5" use thousands separators; otherwise a comma is a decimal point ("5,5")
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d{1,3})?(?![,\d])|\d{1,4}(?:[.,]\d{1,3})?"
+_THOUSANDS = re.compile(r"\d{1,3}(?:,\d{3})+(?:\.\d+)?")
+_UNIT = r"%|mg\s*/\s*dl|mmol\s*/\s*mol|mmol\s*/\s*l|[uµμ]mol\s*/\s*l"
+
+LAB_PATTERN = re.compile(
+    # An analyte right after or before a "/" is part of a ratio ("Total Cholesterol/HDL", "LDL/HDL ratio")
+    rf"(?<![\w/-])(?<!/\s)(?P<analyte>{_alternation(_SYNONYM_TO_ANALYTE)})(?![\w-])(?!\s*/)"
+    r"(?P<gap>[^\d\n<>]{0,40}?)"
+    rf"(?P<value>{_NUMBER})(?![\d/])"
+    rf"\s*(?:\|\s*)?(?P<unit>{_UNIT})?"
+    r"(?:[\s|:]*(?:\(?\s*(?:ref(?:erence)?\.?(?:\s*(?:range|interval))?|normal(?:\s*range)?|bio\.?\s*ref\.?(?:\s*interval)?)\s*[:\-]?\s*)?"
+    rf"\(?\s*(?:(?P<low>{_NUMBER})\s*(?:-|–|to)\s*(?P<high>{_NUMBER})|(?P<bound><|>|≤|≥|<=|>=)\s*(?P<limit>{_NUMBER})))?",
+    re.IGNORECASE
+)
+
+MEDICAL_TERMS_PATTERN = re.compile(rf"(?<![\w-])(?:{_alternation(MEDICAL_KEYWORDS)})(?![\w-])", re.IGNORECASE)
+
+# A "ratio" label between an analyte and its number ("LDL : HDL Ratio 3.2") means it is not the analyte's value
+_NOT_A_VALUE = re.compile(r"\bratio\b", re.IGNORECASE)
+_URINE = re.compile(r"\burin(?:e|ary)\W*$", re.IGNORECASE)
+
+_ROW_END = re.compile(r"</tr\s*>|<br\s*/?>", re.IGNORECASE)
+_CELL_END = re.compile(r"</t[dh]\s*>", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]+>")
+
+def html_table_to_lines(table_html: str) -> str:
+    """Flatten table HTML to one "cell | cell | ..." line per row"""
+    text = _ROW_END.sub("\n", table_html)
+    text = _CELL_END.sub(" | ", text)
+    text = html.unescape(_TAG.sub(" ", text))
+    return "\n".join(" ".join(line.split()) for line in text.splitlines() if line.strip())
+
+def _number(text: Optional[str]) -> Optional[float]:
+    if not text:
+        return None
+    if _THOUSANDS.fullmatch(text):
+        return float(text.replace(",", ""))
+    return float(text.replace(",", "."))
+
+def _normalize_unit(unit: Optional[str]) -> Optional[str]:
+    if not unit:
+        return None
+    unit = re.sub(r"\s+", "", unit).lower().replace("µ", "u").replace("μ", "u")
+    return unit
+
+def _infer_unit(analyte: str, value: float) -> Optional[str]:
+    """Unit for a value reported without one, from the plausible range of each unit"""
+    if analyte == "hba1c":
+        return "%" if value < 20 else "mmol/mol"
+    if analyte == "creatinine":
+        return "mg/dl" if value < 20 else "umol/l"
+    return "mg/dl" if value > 30 else "mmol/l"
+
+def _flag(value: float, low: Optional[float], high: Optional[float], high_is_cutoff: bool = False) -> str:
+    """low/normal/high; with high_is_cutoff a value equal to high already counts as high"""
+    if low is not None and value < low:
+        return "low"
+    if high is not None and (value >= high if high_is_cutoff else value > high):
+        return "high"
+    return "normal"
+
+def extract_lab_values(text: str, source: str = "text") -> List[Dict[str, Any]]:
+    """All recognized lab results in a chunk of text (or flattened table, with a source of "table ...")"""
+    results = []
+    for match in LAB_PATTERN.finditer(text):
+        if _NOT_A_VALUE.search(match.group("gap")):
+            continue
+        if _URINE.search(text[max(0, match.start() - 20):match.start()]):
+            continue
+        analyte = _SYNONYM_TO_ANALYTE[" ".join(match.group("analyte").lower().split())]
+        spec = ANALYTES[analyte]
+        value = _number(match.group("value"))
+        unit = _normalize_unit(match.group("unit"))
+        unit_reported = unit is not None
+        if unit is None:
+            # Without a unit, only a reference range or a table row makes a number a result
+            # ("check your glucose 2 times a day" is not one)
+            has_range = match.group("low") is not None or match.group("bound") is not None
+            if not (has_range or "|" in match.group(0) or source.startswith("table")):
+                continue
+            unit = _infer_unit(analyte, value)
+        if unit not in spec["convert"]:
+            continue  # e.g. a percentage next to a glucose label is something else
+        convert = spec["convert"][unit]
+
+        low, high = _number(match.group("low")), _number(match.group("high"))
+        high_is_cutoff = False
+        if match.group("bound"):
+            limit = _number(match.group("limit"))
+            low, high = (None, limit) if match.group("bound") in ("<", "≤", "<=") else (limit, None)
+            high_is_cutoff = match.group("bound") == "<"
+        # Flag unrounded: against the report's range in the reported unit, else against the
+        # default range in the canonical unit; rounding is for display only
+        reference = None
+        if low is not None or high is not None:
+            reference = {"low": low, "high": high, "unit": UNIT_DISPLAY[unit]}
+            flag = _flag(value, low, high, high_is_cutoff)
+            reference_source = "report"
+        else:
+            default_low, default_high = DEFAULT_RANGES[analyte]
+            flag = _flag(convert(value), default_low, default_high, high_is_cutoff=True)
+            reference_source = "default"
+
+        normalized = round(convert(value), 2)
+        results.append({
+            "analyte": analyte,
+            "name": spec["name"],
+            "value": value,
+            "unit": UNIT_DISPLAY[unit],
+            "unit_reported": unit_reported,
+            "normalized_value": normalized,
+            "normalized_unit": spec["unit"],
+            "reference_range": reference,
+            "flag": flag,
+            "flag_basis": reference_source,
+            "source": source,
+            "match": " ".join(match.group(0).split())
+        })
+    return results
+
+def extract_document_lab_values(texts: List[str], table_htmls: List[str] = ()) -> List[Dict[str, Any]]:
+    """Lab values from all text chunks and tables of a document, without duplicates"""
+    results, seen = [], set()
+    sources = [(text, f"text {i + 1}") for i, text in enumerate(texts)]
+    sources += [(html_table_to_lines(table), f"table {i + 1}") for i, table in enumerate(table_htmls)]
+    for text, source in sources:
+        for result in extract_lab_values(text, source):
+            key = (result["analyte"], result["value"], result["unit"])
+            if key not in seen:
+                seen.add(key)
+                results.append(result)
+    return results
+
+def detect_medical_terms(texts: Iterable[str]) -> List[str]:
+    """Medical keywords present in the texts (whole words only)"""
+    found = set()
+    for text in texts:
+        found.update(match.lower() for match in MEDICAL_TERMS_PATTERN.findall(text))
+    return sorted(found)
+
+def format_lab_finding(result: Dict[str, Any]) -> str:
+    """One-line finding, e.g. "HbA1c 7.2 % (high; reference 4.0-5.6 %)\""""
+    finding = f"{result['name']} {result['value']:g} {result['unit']} ({result['flag']}"
+    reference = result["reference_range"]
+    if reference:
+        if reference["low"] is not None and reference["high"] is not None:
+            finding += f"; reference {reference['low']:g}-{reference['high']:g} {reference['unit']}"
+        elif reference["high"] is not None:
+            finding += f"; reference < {reference['high']:g} {reference['unit']}"
+        else:
+            finding += f"; reference > {reference['low']:g} {reference['unit']}"
+    return finding + ")"
@@ -1,49 +1,37 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from starlette.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
-from PIL import Image
-import io
+import json
 import os
 import uuid
-import base64
-import tempfile
+import hashlib
+import time
 from typing import Dict, Any, List, Optional
 import uvicorn
 from datetime import datetime
 import logging
 from pathlib import Path
 
-# Document processing imports
-from unstructured.partition.pdf import partition_pdf
-from unstructured.partition.docx import partition_docx
-from unstructured.partition.html import partition_html
-from unstructured.partition.text import partition_text
-
-# RAG and AI imports
+# Heavy document processing and AI libraries (unstructured, langchain_groq, Chroma,
+# sentence-transformers) are imported on first use by the loaders in the component registry
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-
-# Try new imports first, fallback to legacy if needed
-try:
-    from langchain_community.vectorstores import Chroma
-    from langchain_community.storage import InMemoryStore
-    from langchain_community.retrievers.multi_vector import MultiVectorRetriever
-except ImportError:
-    from langchain.vectorstores import Chroma
-    from langchain.storage import InMemoryStore
-    from langchain.retrievers.multi_vector import MultiVectorRetriever
-
-try:
-    from langchain_core.documents import Document
-except ImportError:
-    from langchain.schema.document import Document
-
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_core.runnables import RunnablePassthrough, RunnableLambda
-from langchain_core.messages import HumanMessage
+
+from components import ComponentRegistry
+from summarization import build_summary_chain, build_multi_summary_chain, summarize_all, make_standin_llm, model_name, TEXT_PROMPT_TEMPLATE, MULTI_PROMPT_TEMPLATE
+from summary_cache import SummaryCache, cache_key
+from chunk_dedup import group_near_duplicates, DEDUP_ENABLED
+from pdf_partitioning import partition_pdf_adaptive, shutdown_partition_pool, close_page_cache, page_cache_stats
+from quick_extraction import quick_extract_document
+from image_store import ImageStore
+from lab_extraction import extract_document_lab_values, detect_medical_terms, format_lab_finding
+from jobs import JobManager
+from admission import AdmissionScheduler, estimate_cost_mb
+from embedding_cache import CachedEmbeddings, EMBEDDING_BATCH_SIZE
+from access_tokens import AccessTokenStore
+from report_index import SQLiteDocStore, index_report, retrieve_chunks, answer_question, ID_KEY, QA_TOP_K
 
 # Load environment variables
 load_dotenv()
@@ -53,71 +41,124 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Global variables
-llm = None
-embeddings = None
-vectorstore = None
-retriever = None
+components = ComponentRegistry()
+summary_cache = None
+job_manager = JobManager()
+admission = AdmissionScheduler()
+image_store = ImageStore()
+access_tokens = AccessTokenStore()
 
 # Configuration
 SUPPORTED_FORMATS = ['.pdf', '.docx', '.txt', '.html']
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MULTIPART_OVERHEAD = 1024 * 1024  # headroom for form boundaries and fields around the file
 UPLOAD_DIR = "uploads"
 CHROMA_DB_DIR = "chroma_db"
+# Element metadata kept in responses (the rest, e.g. orig_elements and coordinates, is dropped)
+METADATA_FIELDS = ["filename", "filetype", "page_number", "languages", "last_modified", "parent_id"]
+# fields=... sections of the /analyze response
+RESPONSE_FIELDS = ["document", "stats", "report", "index", "raw"]
+JSON_STREAM_CHUNK_SIZE = 64 * 1024
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DOCSTORE_PATH = os.getenv("DOCSTORE_PATH", os.path.join(CHROMA_DB_DIR, "docstore.sqlite3"))
+# Components to load during startup instead of on first use ("all" or a comma-separated list)
+WARM_COMPONENTS = os.getenv("WARM_COMPONENTS", "")
 
 # Ensure directories exist
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(CHROMA_DB_DIR, exist_ok=True)
 
-def initialize_ai_components():
-    """Initialize AI components for document analysis"""
-    global llm, embeddings, vectorstore, retriever
+def load_llm():
+    # SUMMARY_LLM=standin swaps in a local stand-in for offline runs
+    if os.getenv("SUMMARY_LLM") == "standin":
+        return make_standin_llm(latency=float(os.getenv("STANDIN_LLM_LATENCY", "0.5")))
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        model="llama-3.3-70b-versatile",
+        temperature=0.2,
+        groq_api_key=os.getenv("GROQ_API_KEY"),
+    )
+
+def load_embeddings():
+    # Batched, with vectors cached on disk by text hash
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return CachedEmbeddings(
+        HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={"normalize_embeddings": True, "batch_size": EMBEDDING_BATCH_SIZE}
+        ),
+        model_name=EMBEDDING_MODEL
+    )
+
+def load_vectorstore():
+    # Try new imports first, fallback to legacy if needed
+    try:
+        from langchain_community.vectorstores import Chroma
+    except ImportError:
+        from langchain.vectorstores import Chroma
+    return Chroma(
+        collection_name="medical_documents",
+        embedding_function=components.require("embeddings"),
+        persist_directory=CHROMA_DB_DIR
+    )
+
+def load_extraction():
+    """unstructured partitioners and chunker (the PDF partitioner is imported to warm it too)"""
+    from unstructured.partition.docx import partition_docx
+    from unstructured.partition.html import partition_html
+    from unstructured.partition.text import partition_text
+    from unstructured.partition.pdf import partition_pdf  # noqa: F401
+    from unstructured.chunking.title import chunk_by_title
+    return {
+        "partition_docx": partition_docx,
+        "partition_html": partition_html,
+        "partition_text": partition_text,
+        "chunk_by_title": chunk_by_title
+    }
+
+def register_components():
+    """Register AI and extraction components; each is loaded on first use or by /warmup"""
+    components.register("extraction", load_extraction)
+    components.register("llm", load_llm)
+    components.register("embeddings", load_embeddings, lambda embeddings: embeddings.close())
+    components.register("vectorstore", load_vectorstore)
+    # Summaries are embedded in Chroma, the original chunks live in this persistent docstore
+    components.register("docstore", lambda: SQLiteDocStore(DOCSTORE_PATH), lambda docstore: docstore.close())
+
+register_components()
+
+def initialize_summary_cache():
+    """Open the persistent summary cache"""
+    global summary_cache
     
     try:
-        # Initialize LLM
-        llm = ChatGroq(
-            model="llama-3.3-70b-versatile",
-            temperature=0.2,
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-        )
-        
-        # Initialize embeddings
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": True}
-        )
-        
-        # Initialize vectorstore
-        vectorstore = Chroma(
-            collection_name="medical_documents",
-            embedding_function=embeddings,
-            persist_directory=CHROMA_DB_DIR
-        )
-        
-        # Initialize retriever
-        store = InMemoryStore()
-        retriever = MultiVectorRetriever(
-            vectorstore=vectorstore,
-            docstore=store,
-            id_key="doc_id",
-        )
-        
-        logger.info("✓ AI components initialized successfully")
-        
+        summary_cache = SummaryCache()
+        logger.info(f"✓ Summary cache ready ({summary_cache.stats()['entries']} entries)")
     except Exception as e:
-        logger.error(f"Error initializing AI components: {e}")
-        # Set to None to indicate failure
-        llm = embeddings = vectorstore = retriever = None
+        logger.error(f"Error opening summary cache: {e}")
+        summary_cache = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events"""
     # Startup
     logger.info("Starting Medical Document Analysis API...")
-    initialize_ai_components()
+    initialize_summary_cache()
+    if WARM_COMPONENTS:
+        names = None if WARM_COMPONENTS == "all" else [name.strip() for name in WARM_COMPONENTS.split(",") if name.strip()]
+        await run_in_threadpool(components.warm, names)
     yield
     # Shutdown
     logger.info("Shutting down Medical Document Analysis API...")
+    await job_manager.shutdown()
+    if summary_cache is not None:
+        summary_cache.close()
+    components.close_all()
+    access_tokens.close()
+    shutdown_partition_pool()
+    close_page_cache()
 
 app = FastAPI(
     title="Medical Document Analysis API",
@@ -135,6 +176,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses (including streamed JSON) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse uploads whose declared size is over the limit before the body is received"""
+    content_length = request.headers.get("content-length")
+    if request.method == "POST" and content_length and content_length.isdigit() \
+            and int(content_length) > MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": f"File too large. Maximum size: {MAX_FILE_SIZE // (1024 * 1024)}MB"}
+        )
+    return await call_next(request)
+
 def validate_file(file: UploadFile) -> bool:
     """Validate uploaded file"""
     try:
@@ -149,43 +205,39 @@ def validate_file(file: UploadFile) -> bool:
         logger.error(f"File validation error: {e}")
         return False
 
-def save_uploaded_file(file_content: bytes, filename: str) -> str:
-    """Save uploaded file temporarily"""
-    try:
-        file_id = str(uuid.uuid4())
-        file_ext = Path(filename).suffix.lower()
-        temp_filename = f"{file_id}{file_ext}"
-        temp_path = os.path.join(UPLOAD_DIR, temp_filename)
-        
-        with open(temp_path, 'wb') as f:
-            f.write(file_content)
-        
-        return temp_path
-    except Exception as e:
-        logger.error(f"Error saving file: {e}")
-        raise HTTPException(status_code=500, detail="Failed to save uploaded file")
+def new_upload_path(filename: str) -> str:
+    """Unique temporary path for an upload, keeping its extension"""
+    file_id = str(uuid.uuid4())
+    file_ext = Path(filename).suffix.lower()
+    return os.path.join(UPLOAD_DIR, f"{file_id}{file_ext}")
+
+def write_upload_chunk(out, digest, chunk: bytes):
+    digest.update(chunk)
+    out.write(chunk)
 
-def extract_document_elements(file_path: str) -> Dict[str, Any]:
-    """Extract elements from document using unstructured"""
+def extract_document_elements(file_path: str, progress=None, document_id: Optional[str] = None) -> Dict[str, Any]:
+    """Extract elements from document using unstructured
+
+    progress, if given, receives page partitioning events (PDF only). document_id (the
+    upload's SHA-256) keys the per-page result cache; it is computed if not given.
+    """
     try:
         file_ext = Path(file_path).suffix.lower()
+        page_strategies = None
+        extraction = components.require("extraction")
         
         # Choose appropriate partition function based on file type
         if file_ext == '.pdf':
-            chunks = partition_pdf(
-                filename=file_path,
-                infer_table_structure=True,
-                strategy="hi_res",
-                extract_image_block_types=["Image"],
-                extract_image_block_to_payload=True,
-                chunking_strategy="by_title",
+            # Pages are partitioned individually (fast or hi_res), then chunked together
+            pdf_elements, page_strategies = partition_pdf_adaptive(file_path, progress, document_id)
+            chunks = extraction["chunk_by_title"](
+                pdf_elements,
                 max_characters=10000,
                 combine_text_under_n_chars=2000,
                 new_after_n_chars=6000,
-                languages=["eng"]
             )
         elif file_ext == '.docx':
-            chunks = partition_docx(
+            chunks = extraction["partition_docx"](
                 filename=file_path,
                 infer_table_structure=True,
                 chunking_strategy="by_title",
@@ -194,7 +246,7 @@ def extract_document_elements(file_path: str) -> Dict[str, Any]:
                 new_after_n_chars=6000,
             )
         elif file_ext == '.html':
-            chunks = partition_html(
+            chunks = extraction["partition_html"](
                 filename=file_path,
                 chunking_strategy="by_title",
                 max_characters=10000,
@@ -202,7 +254,7 @@ def extract_document_elements(file_path: str) -> Dict[str, Any]:
                 new_after_n_chars=6000,
             )
         elif file_ext == '.txt':
-            chunks = partition_text(
+            chunks = extraction["partition_text"](
                 filename=file_path,
                 chunking_strategy="by_title",
                 max_characters=10000,
@@ -236,16 +288,22 @@ def extract_document_elements(file_path: str) -> Dict[str, Any]:
             "tables": tables,
             "texts": texts,
             "images": images,
-            "total_chunks": len(chunks)
+            "total_chunks": len(chunks),
+            "page_strategies": page_strategies
         }
         
     except Exception as e:
         logger.error(f"Error extracting document elements: {e}")
         raise HTTPException(status_code=500, detail=f"Document extraction failed: {str(e)}")
 
-def generate_summaries(elements: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate AI summaries for extracted elements"""
+async def generate_summaries(elements: Dict[str, Any], job=None) -> Dict[str, Any]:
+    """Generate AI summaries for extracted elements
+
+    When run for a job, each summary is published as a progress event as soon as it is ready.
+    """
     try:
+        # Loaded in the threadpool so a first, cold load does not block the event loop
+        llm = await run_in_threadpool(components.get, "llm")
         if llm is None:
             logger.warning("LLM not available, skipping summary generation")
             return {
@@ -255,80 +313,133 @@ def generate_summaries(elements: Dict[str, Any]) -> Dict[str, Any]:
                 "error": "AI components not available"
             }
         
-        # Text summarization prompt
-        text_prompt = ChatPromptTemplate.from_template("""
-        You are a medical document analyst. Summarize the following text content from a medical document.
-        Focus on key medical information, diagnoses, treatments, and important findings.
+        text_chain = build_summary_chain(llm)
         
-        Text content: {element}
+        # Summarize text chunks and tables together with bounded concurrency
+        table_htmls = [
+            table.metadata.text_as_html if hasattr(table.metadata, 'text_as_html') else str(table)
+            for table in elements["tables"]
+        ]
+        contents = [text.text for text in elements["texts"]] + table_htmls
+        kinds = ["text"] * len(elements["texts"]) + ["table"] * len(table_htmls)
+        summarized = 0
         
-        Provide a concise but comprehensive summary:
-        """)
+        # Near-duplicate chunks (repeated headers, disclaimers, reference tables) share one summary
+        groups = group_near_duplicates(contents, kinds) if DEDUP_ENABLED else list(range(len(contents)))
+        representatives = [i for i, root in enumerate(groups) if root == i]
+        members: Dict[int, List[int]] = {}
+        for i, root in enumerate(groups):
+            members.setdefault(root, []).append(i)
         
-        text_chain = {"element": lambda x: x} | text_prompt | llm | StrOutputParser()
+        async def publish_summary(root: int, result: Dict[str, Any], cached: bool = False):
+            nonlocal summarized
+            for index in members[root]:
+                summarized += 1
+                if job is not None:
+                    await job.publish("summary", {
+                        "kind": kinds[index],
+                        "index": index if kinds[index] == "text" else index - len(elements["texts"]),
+                        "cached": cached,
+                        "duplicate_of": None if index == root else root,
+                        "chunks_summarized": summarized,
+                        "total_chunks": len(contents),
+                        **result
+                    })
+        
+        # Serve repeated chunks from the summary cache and only send misses to the LLM. A summary
+        # is keyed on the prompt that produced it: the per-chunk or the packed template.
+        llm_name = model_name(llm)
+        keys = {
+            i: {
+                False: cache_key(contents[i], TEXT_PROMPT_TEMPLATE, llm_name),
+                True: cache_key(contents[i], MULTI_PROMPT_TEMPLATE, llm_name)
+            } for i in representatives
+        }
+        cached = {}
+        if summary_cache is not None:
+            found = await run_in_threadpool(summary_cache.get_many, [key for pair in keys.values() for key in pair.values()])
+            for i in representatives:
+                summary = found.get(keys[i][False]) or found.get(keys[i][True])
+                if summary is not None:
+                    cached[i] = summary
+        misses = [i for i in representatives if i not in cached]
+        for i in representatives:
+            if i in cached:
+                await publish_summary(i, {"summary": cached[i]}, cached=True)
+        llm_stats = {}
+        miss_results = await summarize_all(
+            text_chain,
+            [contents[i] for i in misses],
+            on_result=lambda j, result: publish_summary(misses[j], result),
+            multi_chain=build_multi_summary_chain(llm),
+            stats=llm_stats
+        )
+        
+        group_results = {i: {"summary": summary} for i, summary in cached.items()}
+        group_results.update(zip(misses, miss_results))
+        results = [group_results[root] for root in groups]
+        if summary_cache is not None:
+            await run_in_threadpool(summary_cache.put_many, {
+                keys[i][result["packed"]]: result["summary"] for i, result in zip(misses, miss_results) if "summary" in result
+            })
+        
+        text_results = results[:len(elements["texts"])]
+        table_results = results[len(elements["texts"]):]
         
-        # Generate text summaries
         text_summaries = []
-        if elements["texts"]:
-            for text in elements["texts"]:
-                try:
-                    summary = text_chain.invoke(text.text)
-                    text_summaries.append({
-                        "original": str(text.text),
-                        "summary": summary,
-                        "metadata": convert_metadata_to_json(text.metadata if hasattr(text, 'metadata') else {})
-                    })
-                except Exception as e:
-                    logger.error(f"Error summarizing text: {e}")
-                    text_summaries.append({
-                        "original": str(text.text),
-                        "summary": "Summary generation failed",
-                        "error": str(e)
-                    })
+        for text, result in zip(elements["texts"], text_results):
+            if "summary" in result:
+                text_summaries.append({
+                    "original": str(text.text),
+                    "summary": result["summary"],
+                    "metadata": compact_metadata(text.metadata if hasattr(text, 'metadata') else {})
+                })
+            else:
+                logger.error(f"Error summarizing text: {result['error']}")
+                text_summaries.append({
+                    "original": str(text.text),
+                    "summary": "Summary generation failed",
+                    "error": result["error"]
+                })
         
-        # Generate table summaries
         table_summaries = []
-        if elements["tables"]:
-            for table in elements["tables"]:
-                try:
-                    table_html = table.metadata.text_as_html if hasattr(table.metadata, 'text_as_html') else str(table)
-                    summary = text_chain.invoke(table_html)
-                    table_summaries.append({
-                        "original": str(table_html),
-                        "summary": summary,
-                        "metadata": convert_metadata_to_json(table.metadata if hasattr(table, 'metadata') else {})
-                    })
-                except Exception as e:
-                    logger.error(f"Error summarizing table: {e}")
-                    table_summaries.append({
-                        "original": str(table),
-                        "summary": "Table summary generation failed",
-                        "error": str(e)
-                    })
+        for table, table_html, result in zip(elements["tables"], table_htmls, table_results):
+            if "summary" in result:
+                table_summaries.append({
+                    "original": str(table_html),
+                    "summary": result["summary"],
+                    "metadata": compact_metadata(table.metadata if hasattr(table, 'metadata') else {})
+                })
+            else:
+                logger.error(f"Error summarizing table: {result['error']}")
+                table_summaries.append({
+                    "original": str(table),
+                    "summary": "Table summary generation failed",
+                    "error": result["error"]
+                })
         
         # Generate image summaries (if vision model is available)
         image_summaries = []
-        for i, image_base64 in enumerate(elements["images"]):
-            try:
-                # For now, just provide metadata about images
-                image_summaries.append({
-                    "image_id": i + 1,
-                    "base64": image_base64,
-                    "summary": "Medical image extracted from document",
-                    "format": "base64_encoded"
-                })
-            except Exception as e:
-                logger.error(f"Error processing image {i}: {e}")
-                image_summaries.append({
-                    "image_id": i + 1,
-                    "summary": "Image processing failed",
-                    "error": str(e)
-                })
+        for ref in elements.get("image_refs", []):
+            # For now, just provide metadata about images; the image itself is served by URL
+            if "error" in ref:
+                image_summaries.append({**ref, "summary": "Image processing failed"})
+            else:
+                image_summaries.append({**ref, "summary": "Medical image extracted from document"})
         
         return {
             "text_summaries": text_summaries,
             "table_summaries": table_summaries,
-            "image_summaries": image_summaries
+            "image_summaries": image_summaries,
+            "cache_stats": {
+                "cache_hits": len(representatives) - len(misses),
+                "llm_calls": llm_stats["llm_requests"],
+                "chunks_sent_to_llm": len(misses),
+                "packed_llm_calls": llm_stats["packed_requests"],
+                "pack_fallbacks": llm_stats["pack_fallbacks"],
+                "duplicate_chunks": len(contents) - len(representatives),
+                "llm_calls_saved_by_dedup": sum(len(members[i]) - 1 for i in misses)
+            }
         }
         
     except Exception as e:
@@ -343,6 +454,14 @@ def generate_summaries(elements: Dict[str, Any]) -> Dict[str, Any]:
 def generate_comprehensive_report(elements: Dict[str, Any], summaries: Dict[str, Any], filename: str) -> Dict[str, Any]:
     """Generate a comprehensive medical document report"""
     try:
+        # Structured lab values straight from text and tables (no LLM involved)
+        lab_started = time.perf_counter()
+        lab_values = extract_document_lab_values(
+            [text.text for text in elements["texts"]],
+            [getattr(table.metadata, "text_as_html", None) or str(table) for table in elements["tables"]]
+        )
+        lab_extraction_ms = round((time.perf_counter() - lab_started) * 1000, 2)
+        
         # Document statistics
         stats = {
             "filename": filename,
@@ -350,31 +469,27 @@ def generate_comprehensive_report(elements: Dict[str, Any], summaries: Dict[str,
             "text_sections": len(elements["texts"]),
             "tables_found": len(elements["tables"]),
             "images_found": len(elements["images"]),
+            "summary_cache_hits": summaries.get("cache_stats", {}).get("cache_hits", 0),
+            "llm_calls": summaries.get("cache_stats", {}).get("llm_calls", 0),
+            "chunks_sent_to_llm": summaries.get("cache_stats", {}).get("chunks_sent_to_llm", 0),
+            "packed_llm_calls": summaries.get("cache_stats", {}).get("packed_llm_calls", 0),
+            "duplicate_chunks": summaries.get("cache_stats", {}).get("duplicate_chunks", 0),
+            "llm_calls_saved_by_dedup": summaries.get("cache_stats", {}).get("llm_calls_saved_by_dedup", 0),
+            "lab_values_found": len(lab_values),
+            "lab_extraction_ms": lab_extraction_ms,
             "processing_date": datetime.now().isoformat()
         }
         
-        # Key findings extraction
-        key_findings = []
+        # Key findings: out-of-range lab values first, then findings from the LLM summaries
+        key_findings = [format_lab_finding(value) for value in lab_values if value["flag"] != "normal"]
         for text_summary in summaries.get("text_summaries", []):
             if "diagnosis" in text_summary.get("summary", "").lower() or \
                "finding" in text_summary.get("summary", "").lower() or \
                "result" in text_summary.get("summary", "").lower():
                 key_findings.append(text_summary["summary"])
         
-        # Medical terms extraction (simple keyword-based)
-        medical_keywords = [
-            "diagnosis", "treatment", "medication", "prescription", "symptom",
-            "condition", "disease", "therapy", "surgery", "procedure",
-            "test", "lab", "blood", "urine", "x-ray", "ct", "mri",
-            "patient", "doctor", "physician", "hospital", "clinic"
-        ]
-        
-        extracted_terms = set()
-        for text in elements["texts"]:
-            text_lower = text.text.lower()
-            for keyword in medical_keywords:
-                if keyword in text_lower:
-                    extracted_terms.add(keyword)
+        # Medical terms extraction (keyword-based, one compiled pattern)
+        extracted_terms = set(detect_medical_terms(text.text for text in elements["texts"]))
         
         # Generate executive summary
         executive_summary = f"""
@@ -385,6 +500,7 @@ def generate_comprehensive_report(elements: Dict[str, Any], summaries: Dict[str,
         - Tables extracted: {stats['tables_found']}
         - Images found: {stats['images_found']}
         - Medical terms identified: {len(extracted_terms)}
+        - Lab values extracted: {len(lab_values)} ({sum(1 for value in lab_values if value["flag"] != "normal")} outside reference range)
         
         Key Medical Topics Detected: {', '.join(sorted(extracted_terms)) if extracted_terms else 'None identified'}
         
@@ -396,6 +512,7 @@ def generate_comprehensive_report(elements: Dict[str, Any], summaries: Dict[str,
             "document_statistics": stats,
             "key_findings": key_findings[:5],  # Top 5 findings
             "medical_terms_detected": sorted(list(extracted_terms)),
+            "lab_values": lab_values,
             "detailed_analysis": {
                 "text_analysis": summaries.get("text_summaries", []),
                 "table_analysis": summaries.get("table_summaries", []),
@@ -426,6 +543,65 @@ def cleanup_temp_file(file_path: str):
     except Exception as e:
         logger.error(f"Error cleaning up file {file_path}: {e}")
 
+def compact_metadata(metadata):
+    """JSON-safe element metadata restricted to METADATA_FIELDS"""
+    metadata_dict = metadata.__dict__ if hasattr(metadata, '__dict__') else metadata
+    if not isinstance(metadata_dict, dict):
+        return {}
+    return convert_metadata_to_json({
+        key: metadata_dict[key] for key in METADATA_FIELDS if metadata_dict.get(key) is not None
+    })
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate a fields=report,stats projection (None means the full response)"""
+    if not fields:
+        return None
+    requested = [field.strip().lower() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in RESPONSE_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields {unknown}. Available: {RESPONSE_FIELDS}"
+        )
+    return requested
+
+def project_response(response_data: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Keep only the requested sections of an analysis response"""
+    if fields is None:
+        return response_data
+    report = response_data.get("analysis_report") or {}
+    sections = {
+        "document": {"document_info": response_data.get("document_info")},
+        "stats": {
+            "extraction_results": response_data.get("extraction_results"),
+            "document_statistics": report.get("document_statistics")
+        },
+        "report": {"analysis_report": report},
+        "index": {"qa_index": response_data.get("qa_index")},
+        "raw": {"raw_data": response_data.get("raw_data")},
+    }
+    projected = {"status": response_data.get("status"), "timestamp": response_data.get("timestamp")}
+    for field in fields:
+        projected.update(sections[field])
+    return projected
+
+def json_stream_response(content: Dict[str, Any], status_code: int = 200) -> StreamingResponse:
+    """Serialize incrementally instead of building the whole JSON document in memory"""
+    encoder = json.JSONEncoder(ensure_ascii=False)
+    
+    def chunks():
+        buffer, size = [], 0
+        for piece in encoder.iterencode(content):
+            buffer.append(piece)
+            size += len(piece)
+            if size >= JSON_STREAM_CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+    
+    return StreamingResponse(chunks(), status_code=status_code, media_type="application/json")
+
 def convert_metadata_to_json(metadata):
     """Convert metadata to JSON-serializable format"""
     try:
@@ -463,6 +639,12 @@ async def root():
         "max_file_size_mb": MAX_FILE_SIZE // (1024 * 1024),
         "endpoints": {
             "/analyze": "POST - Upload and analyze medical document",
+            "/jobs": "POST - Submit a document for background analysis (progress via /jobs/{id}/events)",
+            "/ask": "POST - Ask a question about an analyzed document (needs its access_token)",
+            "/images/{access_token}/{image_id}": "GET - Image extracted during analysis",
+            "/quick-extract": "POST - Text-layer extraction without models or AI analysis",
+            "/admission": "GET - Extraction memory budget and queue",
+            "/warmup": "POST - Load AI and extraction components ahead of traffic",
             "/health": "GET - API health check",
             "/capabilities": "GET - API capabilities and status"
         },
@@ -473,7 +655,13 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    ai_status = "available" if all([llm, embeddings, vectorstore, retriever]) else "limited"
+    status = components.status()
+    if any(component["error"] for component in status.values()):
+        ai_status = "limited"
+    elif all(component["loaded"] for component in status.values()):
+        ai_status = "available"
+    else:
+        ai_status = "lazy"  # loaded on first use, see /warmup
     
     return {
         "status": "healthy",
@@ -493,116 +681,221 @@ async def get_capabilities():
             "extraction_features": [
                 "Text extraction and chunking",
                 "Table structure recognition",
-                "Image extraction (PDF only)",
+                "Image extraction (PDF only, hi_res pages)",
+                "Adaptive per-page PDF strategy (text layer or hi_res)",
                 "Metadata preservation"
             ]
         },
         "ai_analysis": {
-            "llm_available": llm is not None,
-            "embeddings_available": embeddings is not None,
-            "vectorstore_available": vectorstore is not None,
+            "llm_available": components.is_loaded("llm"),
+            "embeddings_available": components.is_loaded("embeddings"),
+            "vectorstore_available": components.is_loaded("vectorstore"),
+            "components": components.status(),
+            "summary_cache": summary_cache.stats() if summary_cache is not None else None,
+            "qa_index": components.get("docstore").stats() if components.is_loaded("docstore") else None,
+            "access_tokens": access_tokens.stats(),
+            "embedding": components.get("embeddings").stats() if components.is_loaded("embeddings") else None,
             "features": [
                 "Text summarization",
                 "Table analysis",
+                "Near-duplicate chunk deduplication",
                 "Key findings extraction",
+                "Structured lab values (HbA1c, glucose, lipids, creatinine) without the LLM",
                 "Medical term identification",
-                "Comprehensive reporting"
+                "Comprehensive reporting",
+                "Question answering over analyzed documents"
             ]
         },
+        "jobs": job_manager.stats(),
+        "admission": admission.stats(),
+        "image_store": image_store.stats(),
+        "page_cache": page_cache_stats(),
         "api_features": [
             "Real-time document processing",
-            "Structured JSON responses",
+            "Background analysis jobs with Server-Sent Events progress",
+            "Structured JSON responses (field projection, gzip, streamed serialization)",
             "Error handling and logging",
             "Temporary file management"
         ]
     }
 
+async def receive_upload(file: UploadFile):
+    """
+    Validate an upload and stream it to a temporary file, returning (path, size in bytes, SHA-256)
+    
+    The file is copied UPLOAD_CHUNK_SIZE bytes at a time and hashed on the way, and the copy
+    stops as soon as it exceeds MAX_FILE_SIZE, so the document is never held in memory.
+    """
+    if not validate_file(file):
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Invalid file. Supported formats: {SUPPORTED_FORMATS}"
+        )
+    
+    temp_path = new_upload_path(file.filename)
+    digest = hashlib.sha256()
+    size_bytes = 0
+    try:
+        with open(temp_path, 'wb') as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size_bytes += len(chunk)
+                # Check file size
+                if size_bytes > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024 * 1024)}MB"
+                    )
+                await run_in_threadpool(write_upload_chunk, out, digest, chunk)
+    except HTTPException:
+        cleanup_temp_file(temp_path)
+        raise
+    except Exception as e:
+        logger.error(f"Error saving file: {e}")
+        cleanup_temp_file(temp_path)
+        raise HTTPException(status_code=500, detail="Failed to save uploaded file")
+    finally:
+        await file.close()
+    
+    return temp_path, size_bytes, digest.hexdigest()
+
+def build_index_entries(summaries: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Chunks to index for Q&A, with their summary (None where summarization failed)"""
+    entries = []
+    for kind, key in (("text", "text_summaries"), ("table", "table_summaries")):
+        for index, item in enumerate(summaries.get(key, [])):
+            entries.append({
+                "kind": kind,
+                "index": index,
+                "original": item["original"],
+                "summary": None if "error" in item else item["summary"]
+            })
+    return entries
+
+async def index_document(document_id: str, filename: str, summaries: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Add an analyzed document to the Q&A index; failures never fail the analysis"""
+    if "error" in summaries:
+        return None
+    vectorstore = await run_in_threadpool(components.get, "vectorstore")
+    docstore = await run_in_threadpool(components.get, "docstore")
+    if vectorstore is None or docstore is None:
+        return None
+    try:
+        return await run_in_threadpool(
+            index_report, vectorstore, docstore, document_id, filename, build_index_entries(summaries)
+        )
+    except Exception as e:
+        logger.error(f"Error indexing document {filename}: {e}")
+        return {"document_id": document_id, "error": str(e)}
+
+async def run_analysis(file_path: str, filename: str, size_bytes: int, document_id: str, job=None) -> Dict[str, Any]:
+    """Full analysis pipeline shared by /analyze and background jobs"""
+    logger.info(f"Processing document: {filename}")
+    
+    # Extract document elements once the memory budget admits this document
+    cost_mb = await run_in_threadpool(estimate_cost_mb, file_path)
+    
+    def on_queue_position(position: int):
+        if job is not None:
+            job.queue_position = position
+            job.publish_threadsafe("queue_position", {"position": position, "cost_mb": cost_mb})
+    
+    async with admission.admit(cost_mb, filename, on_queue_position) as admission_info:
+        if job is not None:
+            job.queue_position = 0
+            await job.publish("admitted", admission_info)
+        elements = await run_in_threadpool(
+            extract_document_elements, file_path, job.progress_callback() if job else None, document_id
+        )
+    if job is not None:
+        await job.publish("extraction_complete", {
+            "total_chunks": elements["total_chunks"],
+            "text_sections": len(elements["texts"]),
+            "tables_found": len(elements["tables"]),
+            "images_found": len(elements["images"])
+        })
+    
+    # Only this response gets the token that grants /ask and /images access to the document
+    access_token = await run_in_threadpool(access_tokens.issue, document_id)
+    
+    # Store extracted images once; responses reference them by URL
+    elements["image_refs"] = await run_in_threadpool(image_store.save, document_id, elements["images"], access_token)
+    
+    # Generate summaries
+    summaries = await generate_summaries(elements, job)
+    
+    # Embed chunk summaries so follow-up questions can use /ask
+    index_info = await index_document(document_id, filename, summaries)
+    if job is not None and index_info is not None:
+        await job.publish("indexed", index_info)
+    
+    # Generate comprehensive report
+    report = generate_comprehensive_report(elements, summaries, filename)
+    
+    # Prepare response with JSON-safe data
+    response_data = {
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "document_info": {
+            "filename": filename,
+            "size_bytes": size_bytes,
+            "format": Path(filename).suffix.lower(),
+            "document_id": document_id,
+            "access_token": access_token
+        },
+        "qa_index": index_info,
+        "extraction_results": {
+            "total_chunks": elements["total_chunks"],
+            "text_sections": len(elements["texts"]),
+            "tables_found": len(elements["tables"]),
+            "images_found": len(elements["images"]),
+            "page_strategies": elements["page_strategies"],
+            "admission": admission_info
+        },
+        "analysis_report": report,
+        "raw_data": {
+            "text_content": [
+                {
+                    "text": str(text.text), 
+                    "metadata": compact_metadata(text.metadata if hasattr(text, 'metadata') else {})
+                } for text in elements["texts"]
+            ],
+            "tables": [
+                {
+                    "content": str(table), 
+                    "metadata": compact_metadata(table.metadata if hasattr(table, 'metadata') else {})
+                } for table in elements["tables"]
+            ],
+            "images": elements["image_refs"]
+        } if elements["total_chunks"] > 0 else None
+    }
+    
+    logger.info(f"Document analysis completed: {filename} - "
+               f"{elements['total_chunks']} chunks, {len(elements['texts'])} texts, "
+               f"{len(elements['tables'])} tables, {len(elements['images'])} images")
+    
+    return response_data
+
 @app.post("/analyze")
-async def analyze_document(file: UploadFile = File(...)):
+async def analyze_document(file: UploadFile = File(...), fields: Optional[str] = None):
     """
     Analyze uploaded medical document and generate comprehensive report
     
+    fields optionally limits the response to some of: document, stats, report, index, raw
+    (e.g. ?fields=report,stats). Images are referenced by URL, see /images.
+    
     Returns:
         JSON response with extracted content, summaries, and analysis report
     """
     temp_file_path = None
+    requested_fields = parse_fields(fields)
     
     try:
-        # Validate file
-        if not validate_file(file):
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid file. Supported formats: {SUPPORTED_FORMATS}"
-            )
-        
-        # Read file content
-        file_content = await file.read()
-        
-        # Check file size
-        if len(file_content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024 * 1024)}MB"
-            )
-        
-        # Save file temporarily
-        temp_file_path = save_uploaded_file(file_content, file.filename)
-        
-        logger.info(f"Processing document: {file.filename}")
-        
-        # Extract document elements
-        elements = extract_document_elements(temp_file_path)
-        
-        # Generate summaries
-        summaries = generate_summaries(elements)
-        
-        # Generate comprehensive report
-        report = generate_comprehensive_report(elements, summaries, file.filename)
-        
-        # Prepare response with JSON-safe data
-        response_data = {
-            "status": "success",
-            "timestamp": datetime.now().isoformat(),
-            "document_info": {
-                "filename": file.filename,
-                "size_bytes": len(file_content),
-                "format": Path(file.filename).suffix.lower()
-            },
-            "extraction_results": {
-                "total_chunks": elements["total_chunks"],
-                "text_sections": len(elements["texts"]),
-                "tables_found": len(elements["tables"]),
-                "images_found": len(elements["images"])
-            },
-            "analysis_report": report,
-            "raw_data": {
-                "text_content": [
-                    {
-                        "text": str(text.text), 
-                        "metadata": convert_metadata_to_json(text.metadata if hasattr(text, 'metadata') else {})
-                    } for text in elements["texts"]
-                ],
-                "tables": [
-                    {
-                        "content": str(table), 
-                        "metadata": convert_metadata_to_json(table.metadata if hasattr(table, 'metadata') else {})
-                    } for table in elements["tables"]
-                ],
-                "images": [
-                    {
-                        "image_id": i+1, 
-                        "base64": str(img) if img else None,
-                        "size": len(str(img)) if img else 0
-                    } for i, img in enumerate(elements["images"])
-                ]
-            } if elements["total_chunks"] > 0 else None
-        }
-        
-        logger.info(f"Document analysis completed: {file.filename} - "
-                   f"{elements['total_chunks']} chunks, {len(elements['texts'])} texts, "
-                   f"{len(elements['tables'])} tables, {len(elements['images'])} images")
-        
-        return JSONResponse(content=response_data)
+        temp_file_path, size_bytes, document_id = await receive_upload(file)
+        response_data = await run_analysis(temp_file_path, file.filename, size_bytes, document_id)
+        return json_stream_response(project_response(response_data, requested_fields))
         
     except HTTPException:
         raise
@@ -614,6 +907,151 @@ async def analyze_document(file: UploadFile = File(...)):
         if temp_file_path:
             cleanup_temp_file(temp_file_path)
 
+@app.post("/jobs", status_code=202)
+async def submit_analysis_job(file: UploadFile = File(...)):
+    """
+    Submit a document for background analysis
+    
+    Returns immediately with a job ID. Follow progress at /jobs/{job_id}/events
+    (Server-Sent Events) and fetch the finished report from /jobs/{job_id}/report.
+    """
+    temp_file_path, size_bytes, document_id = await receive_upload(file)
+    job = job_manager.submit(
+        file.filename,
+        lambda job: run_analysis(temp_file_path, file.filename, size_bytes, document_id, job),
+        cleanup=lambda: cleanup_temp_file(temp_file_path)
+    )
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+        "report_url": f"/jobs/{job.id}/report"
+    }
+
+def get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Current status of an analysis job"""
+    return get_job_or_404(job_id).info()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """Stream job progress as Server-Sent Events (resumable via Last-Event-ID)"""
+    job = get_job_or_404(job_id)
+    try:
+        last_event_id = int(request.headers.get("last-event-id", "-1"))
+    except ValueError:
+        last_event_id = -1
+    return StreamingResponse(
+        job.stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/jobs/{job_id}/report")
+async def get_job_report(job_id: str, fields: Optional[str] = None):
+    """Finished analysis report of a job (fields as for /analyze)"""
+    requested_fields = parse_fields(fields)
+    job = get_job_or_404(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Document analysis failed: {job.error}")
+    if job.status != "completed":
+        return JSONResponse(status_code=202, content=job.info())
+    return json_stream_response(project_response(job.result, requested_fields))
+
+@app.get("/images/{access_token}/{image_id}")
+async def get_image(access_token: str, image_id: int):
+    """An image extracted from an analyzed document, addressed by the upload's access token"""
+    document_id = await run_in_threadpool(access_tokens.resolve, access_token)
+    found = image_store.path(document_id, image_id) if document_id else None
+    if found is None:
+        raise HTTPException(status_code=404, detail="Image not found or expired")
+    path, mime_type = found
+    return FileResponse(path, media_type=mime_type)
+
+@app.post("/ask")
+async def ask_question(payload: Dict[str, Any]):
+    """
+    Answer a question about a previously analyzed document
+    
+    Body: {"question": str, "document_id": str, "access_token": str, "k": optional int}, with
+    document_id and access_token from the /analyze response. Retrieval never crosses
+    documents. It uses the persistent index, so the document is not parsed or summarized again.
+    """
+    question = str(payload.get("question") or "").strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="A question is required")
+    document_id = payload.get("document_id")
+    if not document_id or not isinstance(document_id, str):
+        raise HTTPException(status_code=400, detail="document_id is required")
+    if not await run_in_threadpool(access_tokens.authorize, payload.get("access_token"), document_id):
+        raise HTTPException(status_code=403, detail="Invalid or expired access token for this document")
+    llm = await run_in_threadpool(components.get, "llm")
+    vectorstore = await run_in_threadpool(components.get, "vectorstore")
+    docstore = await run_in_threadpool(components.get, "docstore")
+    if llm is None or vectorstore is None or docstore is None:
+        raise HTTPException(status_code=503, detail="AI components not available")
+    
+    if await run_in_threadpool(docstore.get_document, document_id) is None:
+        raise HTTPException(status_code=404, detail="Document not indexed; analyze it first")
+    try:
+        k = max(1, min(int(payload.get("k", QA_TOP_K)), 20))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="k must be an integer")
+    
+    try:
+        chunks = await run_in_threadpool(retrieve_chunks, vectorstore, docstore, question, document_id, k)
+        if not chunks:
+            answer = "No indexed document content matches this question."
+        else:
+            answer = await answer_question(llm, chunks, question)
+    except Exception as e:
+        logger.error(f"Error answering question: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Question answering failed: {str(e)}")
+    
+    return {
+        "question": question,
+        "answer": answer,
+        "document_id": document_id,
+        "sources": [
+            {
+                "document_id": chunk.metadata.get("document_id"),
+                "filename": chunk.metadata.get("filename"),
+                "kind": chunk.metadata.get("kind"),
+                "index": chunk.metadata.get("index"),
+                "excerpt": chunk.page_content[:300]
+            } for chunk in chunks
+        ],
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.post("/warmup")
+async def warm_up(components_to_warm: Optional[str] = Query(None, alias="components")):
+    """
+    Load components ahead of traffic instead of on first use
+    
+    ?components= takes a comma-separated list (default: all). Failed components are retried.
+    Returns each component's status and load time.
+    """
+    names = None
+    if components_to_warm:
+        names = [name.strip() for name in components_to_warm.split(",") if name.strip()]
+        unknown = [name for name in names if name not in components.names()]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown components {unknown}. Available: {components.names()}")
+    return {"components": await run_in_threadpool(components.warm, names)}
+
+@app.get("/admission")
+async def get_admission_status():
+    """Extraction admission metrics: memory budget, usage, queue and wait times"""
+    return admission.stats()
+
 @app.post("/quick-extract")
 async def quick_extract(file: UploadFile = File(...)):
     """
@@ -623,49 +1061,35 @@ async def quick_extract(file: UploadFile = File(...)):
     
     try:
         # Validate and save file
-        if not validate_file(file):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file. Supported formats: {SUPPORTED_FORMATS}"
-            )
+        temp_file_path, size_bytes, _ = await receive_upload(file)
         
-        file_content = await file.read()
-        if len(file_content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024 * 1024)}MB"
-            )
-        
-        temp_file_path = save_uploaded_file(file_content, file.filename)
-        
-        # Extract elements only
-        elements = extract_document_elements(temp_file_path)
+        # Text-layer extraction only: no layout models, OCR or table inference
+        elements = await run_in_threadpool(quick_extract_document, temp_file_path)
+        lab_values = extract_document_lab_values(elements["texts"], elements["tables"])
         
         response_data = {
             "status": "success",
             "timestamp": datetime.now().isoformat(),
             "document_info": {
                 "filename": file.filename,
-                "size_bytes": len(file_content),
+                "size_bytes": size_bytes,
                 "format": Path(file.filename).suffix.lower()
             },
             "extraction_summary": {
-                "total_chunks": elements["total_chunks"],
+                "total_chunks": len(elements["texts"]) + len(elements["tables"]),
                 "text_sections": len(elements["texts"]),
                 "tables_found": len(elements["tables"]),
-                "images_found": len(elements["images"])
+                "images_found": len(elements["images_info"]),
+                "pages": elements["pages"],
+                "extraction_seconds": elements["extraction_seconds"]
             },
             "extracted_content": {
-                "texts": [str(text.text) for text in elements["texts"]],
-                "tables": [str(table) for table in elements["tables"]],
-                "image_count": len(elements["images"]),
-                "images_info": [
-                    {
-                        "image_id": i+1, 
-                        "size": len(str(img)) if img else 0
-                    } for i, img in enumerate(elements["images"])
-                ]
-            }
+                "texts": elements["texts"],
+                "tables": elements["tables"],
+                "image_count": len(elements["images_info"]),
+                "images_info": elements["images_info"]
+            },
+            "lab_values": lab_values
         }
         
         return JSONResponse(content=response_data)
@@ -686,6 +1110,7 @@ if __name__ == "__main__":
     print("  - http://localhost:8000/health (health check)")
     print("  - http://localhost:8000/analyze (full document analysis)")
     print("  - http://localhost:8000/quick-extract (quick extraction)")
+    print("  - http://localhost:8000/ask (questions about analyzed documents)")
     
     uvicorn.run(
         "main:app",
@@ -0,0 +1,139 @@
+"""Persistent cache of per-page PDF partitioning results.
+
+Rasterizing, OCR and layout detection are the expensive part of hi_res partitioning. The
+elements produced for each page are stored, zlib-compressed, in a local SQLite file keyed
+by the document's SHA-256, the page number and the partitioning strategy. When a document
+fails halfway through /analyze, or is analyzed again, the pages that already finished are
+read back and only the rest are partitioned. The cache is capped at PAGE_CACHE_MAX_MB and
+evicts the least recently used pages.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "1") != "0"
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", os.path.join("cache", "page_cache.sqlite3"))
+PAGE_CACHE_MAX_MB = int(os.getenv("PAGE_CACHE_MAX_MB", "1024"))
+# Bump when partitioning options change so stale layouts are not reused
+PAGE_CACHE_VERSION = "1"
+
+def serialize_elements(elements: List[Any]) -> bytes:
+    from unstructured.staging.base import elements_to_json
+    return zlib.compress(elements_to_json(elements).encode("utf-8"))
+
+def deserialize_elements(data: bytes) -> List[Any]:
+    from unstructured.staging.base import elements_from_json
+    return elements_from_json(text=zlib.decompress(data).decode("utf-8"))
+
+class PageCache:
+    """SQLite-backed LRU cache of partitioned pages, bounded by total size"""
+
+    def __init__(self, path: str = PAGE_CACHE_PATH, max_mb: int = PAGE_CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "document_id TEXT NOT NULL, page INTEGER NOT NULL, strategy TEXT NOT NULL, "
+            "data BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (document_id, page, strategy))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def _strategy_key(strategy: str) -> str:
+        return f"{strategy}:v{PAGE_CACHE_VERSION}"
+
+    def get_pages(self, document_id: str, pages: Iterable[Tuple[int, str]]) -> Dict[int, List[Any]]:
+        """Cached elements for the (page, strategy) pairs that are present, by page number"""
+        pages = list(pages)
+        rows = {}
+        with self._lock:
+            for page, strategy in pages:
+                row = self._conn.execute(
+                    "SELECT data FROM pages WHERE document_id = ? AND page = ? AND strategy = ?",
+                    (document_id, page, self._strategy_key(strategy))
+                ).fetchone()
+                if row is not None:
+                    rows[page] = (strategy, row[0])
+            if rows:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE pages SET last_used = ? WHERE document_id = ? AND page = ? AND strategy = ?",
+                    [(now, document_id, page, self._strategy_key(strategy)) for page, (strategy, _) in rows.items()]
+                )
+                self._conn.commit()
+            self._hits += len(rows)
+            self._misses += len(pages) - len(rows)
+
+        found = {}
+        for page, (_, data) in rows.items():
+            try:
+                found[page] = deserialize_elements(data)
+            except Exception as e:
+                logger.warning(f"Discarding unreadable cached page {page} of {document_id}: {e}")
+        return found
+
+    def put_pages(self, document_id: str, strategy: str, pages: Dict[int, List[Any]]):
+        """Store the elements of each page (an empty list marks a page without elements)"""
+        if not pages:
+            return
+        now = time.time()
+        rows = []
+        for page, elements in pages.items():
+            data = serialize_elements(elements)
+            rows.append((document_id, page, self._strategy_key(strategy), data, len(data), now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (document_id, page, strategy, data, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for document_id, page, strategy, size in self._conn.execute(
+                "SELECT document_id, page, strategy, size FROM pages ORDER BY last_used ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(
+                "DELETE FROM pages WHERE document_id = ? AND page = ? AND strategy = ?", (document_id, page, strategy)
+            )
+            total -= size
+            evicted += 1
+        logger.info(f"Page cache evicted {evicted} pages")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pages, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+            hits, misses = self._hits, self._misses
+        return {
+            "pages": pages,
+            "size_mb": round(total / (1024 * 1024), 2),
+            "max_mb": self.max_bytes // (1024 * 1024),
+            "hits": hits,
+            "misses": misses
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,363 @@
+"""Adaptive, page-level PDF partitioning.
+
+Every page is inspected through its text layer first. Pages with a usable text layer
+are partitioned with the fast strategy; only scanned pages (little or no extractable
+text) and pages that look tabular go through hi_res layout detection, OCR and table
+structure inference. Elements from all pages are then chunked together, so by_title
+sections still span page boundaries.
+
+Page ranges are partitioned in a bounded, long-lived process pool so multi-page documents
+use several cores and hi_res models stay loaded between requests. A watchdog thread in
+each worker ends it once its resident memory exceeds PARTITION_WORKER_MEMORY_MB, and the
+worker count is capped so that all workers together fit in physical memory. Resident
+memory is limited, not address space: torch and onnxruntime reserve far more virtual
+memory than they touch, so an RLIMIT_AS cap fails hi_res pages with spurious MemoryErrors.
+
+Finished pages are stored in the page cache as each range completes, so a retry or
+re-analysis only partitions the pages that are not cached yet.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+from page_cache import PageCache, PAGE_CACHE_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+PDF_PARTITION_STRATEGY = os.getenv("PDF_PARTITION_STRATEGY", "adaptive")  # "adaptive" or "hi_res"
+MIN_TEXT_LAYER_CHARS = int(os.getenv("MIN_TEXT_LAYER_CHARS", "100"))
+TABULAR_LINE_RATIO = float(os.getenv("TABULAR_LINE_RATIO", "0.3"))
+TABULAR_MIN_LINES = int(os.getenv("TABULAR_MIN_LINES", "5"))
+PARTITION_WORKERS = int(os.getenv("PARTITION_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARTITION_WORKER_MEMORY_MB = int(os.getenv("PARTITION_WORKER_MEMORY_MB", "3072"))
+PARTITION_MEMORY_POLL_SECONDS = float(os.getenv("PARTITION_MEMORY_POLL_SECONDS", "0.5"))
+PAGES_PER_TASK = int(os.getenv("PARTITION_PAGES_PER_TASK", "4"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+_NUMBER = re.compile(r"(?<![A-Za-z])\d+(?:[.,]\d+)?")
+
+def classify_page_text(text: str) -> Tuple[str, str]:
+    """Pick a strategy for a page from its text layer, returning (strategy, reason)"""
+    if len(text.strip()) < MIN_TEXT_LAYER_CHARS:
+        return "hi_res", "scanned"
+
+    lines = [line for line in text.splitlines() if line.strip()]
+    numeric_lines = sum(1 for line in lines if len(_NUMBER.findall(line)) >= 2)
+    if numeric_lines >= TABULAR_MIN_LINES and numeric_lines >= TABULAR_LINE_RATIO * len(lines):
+        return "hi_res", "tabular"
+
+    return "fast", "text_layer"
+
+def plan_pdf_pages(file_path: str) -> List[Dict[str, Any]]:
+    """Inspect each page's text layer and decide how to partition it"""
+    reader = PdfReader(file_path)
+    plans = []
+    for index, page in enumerate(reader.pages):
+        if PDF_PARTITION_STRATEGY == "hi_res":
+            strategy, reason = "hi_res", "forced"
+        else:
+            try:
+                text = page.extract_text() or ""
+            except Exception as e:
+                logger.warning(f"Text layer extraction failed on page {index + 1}: {e}")
+                text = ""
+            strategy, reason = classify_page_text(text)
+        plans.append({"page": index + 1, "strategy": strategy, "reason": reason})
+    return plans
+
+def write_page_range(reader: PdfReader, first_page: int, last_page: int, directory: str) -> str:
+    """Write pages first_page..last_page (1-based, inclusive) to their own PDF file"""
+    writer = PdfWriter()
+    for index in range(first_page - 1, last_page):
+        writer.add_page(reader.pages[index])
+    path = os.path.join(directory, f"pages_{first_page}_{last_page}.pdf")
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+def partition_pdf_pages(file_path: str, strategy: str, page_offset: int = 0) -> List[Any]:
+    """Partition a PDF (or page range file) with one strategy, renumbering pages by page_offset"""
+    # Imported here so that loading this module (and main) does not pull in unstructured
+    from unstructured.partition.pdf import partition_pdf
+
+    if strategy == "hi_res":
+        elements = partition_pdf(
+            filename=file_path,
+            infer_table_structure=True,
+            strategy="hi_res",
+            extract_image_block_types=["Image"],
+            extract_image_block_to_payload=True,
+            languages=["eng"]
+        )
+    else:
+        elements = partition_pdf(
+            filename=file_path,
+            strategy="fast",
+            languages=["eng"]
+        )
+
+    if page_offset:
+        for element in elements:
+            if getattr(element.metadata, "page_number", None) is not None:
+                element.metadata.page_number += page_offset
+    return elements
+
+def plan_page_ranges(plans: List[Dict[str, Any]], pages_per_task: int = PAGES_PER_TASK) -> List[Dict[str, Any]]:
+    """Group consecutive pages that share a strategy into ranges of at most pages_per_task pages"""
+    ranges = []
+    for plan in plans:
+        current = ranges[-1] if ranges else None
+        if (current and current["strategy"] == plan["strategy"]
+                and current["last_page"] == plan["page"] - 1
+                and current["last_page"] - current["first_page"] + 1 < pages_per_task):
+            current["last_page"] = plan["page"]
+        else:
+            ranges.append({"first_page": plan["page"], "last_page": plan["page"], "strategy": plan["strategy"]})
+    return ranges
+
+def effective_worker_count() -> int:
+    """Configured workers, reduced so every worker's memory budget fits in physical memory"""
+    workers = max(1, PARTITION_WORKERS)
+    try:
+        total_mb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+        workers = min(workers, max(1, total_mb // max(1, PARTITION_WORKER_MEMORY_MB)))
+    except (ValueError, OSError, AttributeError):
+        pass
+    return workers
+
+def resident_memory_mb() -> Optional[float]:
+    """Current resident set size of this process (Linux), or None if unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _watch_worker_memory(memory_mb: int, poll_seconds: float):
+    while True:
+        resident_mb = resident_memory_mb()
+        if resident_mb is not None and resident_mb > memory_mb:
+            # Ending the process breaks the pool; the caller reports it and starts a fresh one
+            sys.stderr.write(
+                f"Partition worker {os.getpid()} using {resident_mb:.0f}MB resident memory, "
+                f"over PARTITION_WORKER_MEMORY_MB={memory_mb}; exiting\n"
+            )
+            sys.stderr.flush()
+            os._exit(137)
+        time.sleep(poll_seconds)
+
+def _limit_worker_memory(memory_mb: int, poll_seconds: float = PARTITION_MEMORY_POLL_SECONDS):
+    """Pool initializer: start the resident memory watchdog for this worker"""
+    if resident_memory_mb() is None:
+        logger.warning("Resident memory is not readable here; partition workers run without a memory limit")
+        return
+    threading.Thread(
+        target=_watch_worker_memory, args=(memory_mb, poll_seconds), name="memory-watchdog", daemon=True
+    ).start()
+
+def _partition_range(range_file: str, strategy: str, page_offset: int) -> Tuple[List[Any], float]:
+    started = time.perf_counter()
+    elements = partition_pdf_pages(range_file, strategy, page_offset)
+    return elements, time.perf_counter() - started
+
+def get_partition_pool():
+    """Shared partition process pool, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = effective_worker_count()
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_limit_worker_memory,
+                initargs=(PARTITION_WORKER_MEMORY_MB, PARTITION_MEMORY_POLL_SECONDS)
+            )
+            logger.info(f"Started partition pool: {workers} workers, {PARTITION_WORKER_MEMORY_MB}MB each")
+        return _pool
+
+def reset_partition_pool(broken_pool: ProcessPoolExecutor):
+    """
+    Discard a broken pool (e.g. a worker exceeded its memory budget) so the next request starts fresh.
+
+    Only broken_pool is discarded: when several requests see the same breakage, a later one must
+    not shut down the replacement pool that another request already started using.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is broken_pool:
+            _pool = None
+    broken_pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_partition_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+def get_page_cache() -> Optional[PageCache]:
+    """Shared page cache, opened on first use (None if disabled or unavailable)"""
+    global _page_cache
+    if not PAGE_CACHE_ENABLED:
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            try:
+                _page_cache = PageCache()
+            except Exception as e:
+                logger.error(f"Error opening page cache: {e}")
+                return None
+        return _page_cache
+
+def page_cache_stats() -> Optional[Dict[str, Any]]:
+    return _page_cache.stats() if _page_cache is not None else None
+
+def close_page_cache():
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is not None:
+            _page_cache.close()
+            _page_cache = None
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _split_by_page(elements: List[Any], first_page: int, last_page: int) -> Dict[int, List[Any]]:
+    pages = {page: [] for page in range(first_page, last_page + 1)}
+    for element in elements:
+        page = getattr(element.metadata, "page_number", None)
+        pages[page if page in pages else first_page].append(element)
+    return pages
+
+def partition_pdf_adaptive(file_path: str,
+                           progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                           document_id: Optional[str] = None) -> Tuple[List[Any], List[Dict[str, Any]]]:
+    """
+    Partition a PDF page range by page range with the strategy chosen for each page.
+
+    Pages already in the page cache (keyed by document_id, the file's SHA-256, page and
+    strategy) are read back; the remaining ranges run in parallel in the partition pool and
+    everything is merged back in page order. Returns the un-chunked elements and a per-page
+    report with the strategy, the reason it was chosen, whether it came from the cache and
+    the time spent on the range containing that page.
+    progress, if given, is called with a pages_partitioned event as each range finishes.
+    """
+    plans = plan_pdf_pages(file_path)
+    cache = get_page_cache()
+    cached_pages = {}
+    if cache is not None:
+        document_id = document_id or file_sha256(file_path)
+        cached_pages = cache.get_pages(document_id, [(plan["page"], plan["strategy"]) for plan in plans])
+    ranges = plan_page_ranges([plan for plan in plans if plan["page"] not in cached_pages])
+    reader = PdfReader(file_path)
+    elements = []
+    pages_done = len(cached_pages)
+    if cached_pages and progress:
+        progress({
+            "event": "pages_partitioned",
+            "pages_done": pages_done,
+            "total_pages": len(plans),
+            "range": "cache",
+            "strategy": "cached"
+        })
+
+    def report(page_range):
+        nonlocal pages_done
+        pages_done += page_range["last_page"] - page_range["first_page"] + 1
+        if progress:
+            progress({
+                "event": "pages_partitioned",
+                "pages_done": pages_done,
+                "total_pages": len(plans),
+                "range": f"{page_range['first_page']}-{page_range['last_page']}",
+                "strategy": page_range["strategy"]
+            })
+
+    def finish(index: int, result: Tuple[List[Any], float]):
+        """Keep a finished range and cache its pages right away, so a later failure keeps them"""
+        results[index] = result
+        page_range = ranges[index]
+        if cache is not None:
+            try:
+                cache.put_pages(
+                    document_id, page_range["strategy"],
+                    _split_by_page(result[0], page_range["first_page"], page_range["last_page"])
+                )
+            except Exception as e:
+                logger.warning(f"Could not cache pages {page_range['first_page']}-{page_range['last_page']}: {e}")
+        report(page_range)
+
+    results: Dict[int, Tuple[List[Any], float]] = {}
+    with tempfile.TemporaryDirectory(prefix="pdf_pages_") as directory:
+        jobs = [
+            (write_page_range(reader, r["first_page"], r["last_page"], directory), r["strategy"], r["first_page"] - 1)
+            for r in ranges
+        ]
+        if len(jobs) > 1 and effective_worker_count() > 1:
+            pool = get_partition_pool()
+            errors = []
+            try:
+                futures = {pool.submit(_partition_range, *job): i for i, job in enumerate(jobs)}
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        # Let the other ranges finish (and be cached) before failing
+                        errors.append(e)
+                        continue
+                    finish(futures[future], result)
+            except BrokenProcessPool:
+                reset_partition_pool(pool)
+                raise RuntimeError("A partition worker crashed, possibly exceeding PARTITION_WORKER_MEMORY_MB")
+            if errors:
+                raise errors[0]
+        else:
+            for i, job in enumerate(jobs):
+                finish(i, _partition_range(*job))
+
+    # Merge cached pages and partitioned ranges back in page order
+    segments = [(page, page_elements) for page, page_elements in cached_pages.items()]
+    segments += [(page_range["first_page"], results[i][0]) for i, page_range in enumerate(ranges)]
+    for _, segment_elements in sorted(segments, key=lambda segment: segment[0]):
+        elements.extend(segment_elements)
+
+    for plan in plans:
+        if plan["page"] in cached_pages:
+            plan.update({"cached": True, "range": "cache", "seconds": 0.0, "range_elements": len(cached_pages[plan["page"]])})
+    for i, page_range in enumerate(ranges):
+        range_elements, seconds = results[i]
+        for plan in plans[page_range["first_page"] - 1:page_range["last_page"]]:
+            plan["cached"] = False
+            plan["range"] = f"{page_range['first_page']}-{page_range['last_page']}"
+            plan["seconds"] = round(seconds, 3)
+            plan["range_elements"] = len(range_elements)
+
+    logger.info(
+        f"Adaptive partitioning: {sum(1 for p in plans if p['strategy'] == 'fast')} fast pages, "
+        f"{sum(1 for p in plans if p['strategy'] == 'hi_res')} hi_res pages in {len(ranges)} ranges, "
+        f"{len(cached_pages)} pages from cache"
+    )
+    return elements, plans
@@ -0,0 +1,195 @@
+"""Lightweight document extraction for /quick-extract.
+
+Reads only what is already in the file: the PDF text layer through pypdf, DOCX paragraphs
+and tables through python-docx, HTML through the standard library parser and plain text
+as-is. No layout model, OCR or table-structure inference is loaded, so typical lab reports
+extract in well under a second. Scanned PDFs without a text layer yield no text here; use
+/analyze for those.
+"""
+import argparse
+import logging
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, List
+
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Mirrors the by_title chunk sizes used by the full extraction
+MAX_CHUNK_CHARS = 6000
+
+def chunk_paragraphs(paragraphs: List[str], max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
+    """Group consecutive paragraphs into chunks of at most max_chars"""
+    chunks, current, size = [], [], 0
+    for paragraph in paragraphs:
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and size + len(paragraph) > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def extract_pdf(file_path: str) -> Dict[str, Any]:
+    reader = PdfReader(file_path)
+    paragraphs, images_info = [], []
+    for page_number, page in enumerate(reader.pages, start=1):
+        paragraphs.extend((page.extract_text() or "").split("\n\n"))
+        try:
+            image_names = page.images.keys()
+        except Exception:
+            image_names = []
+        for _ in image_names:
+            images_info.append({"image_id": len(images_info) + 1, "page": page_number})
+    return {"texts": chunk_paragraphs(paragraphs), "tables": [], "images_info": images_info, "pages": len(reader.pages)}
+
+def extract_docx(file_path: str) -> Dict[str, Any]:
+    import docx
+
+    document = docx.Document(file_path)
+    tables = [
+        "\n".join(" | ".join(cell.text.strip() for cell in row.cells) for row in table.rows)
+        for table in document.tables
+    ]
+    images_info = [{"image_id": i + 1} for i in range(len(document.inline_shapes))]
+    return {
+        "texts": chunk_paragraphs([paragraph.text for paragraph in document.paragraphs]),
+        "tables": tables,
+        "images_info": images_info,
+        "pages": None
+    }
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collects block text, table rows and image count from HTML"""
+
+    BLOCK_TAGS = {"p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "tr"}
+
+    def __init__(self):
+        super().__init__()
+        self.paragraphs, self.tables, self.images = [], [], 0
+        self._text, self._skip = [], 0
+        self._table_depth, self._rows, self._row, self._cell = 0, [], None, None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag == "img":
+            self.images += 1
+        elif tag == "table":
+            self._table_depth += 1
+            if self._table_depth == 1:
+                self._flush()
+                self._rows = []
+        elif self._table_depth:
+            if tag == "tr":
+                self._row = []
+            elif tag in ("td", "th"):
+                self._cell = []
+        elif tag in self.BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip = max(0, self._skip - 1)
+        elif tag == "table" and self._table_depth:
+            self._table_depth -= 1
+            if self._table_depth == 0 and self._rows:
+                self.tables.append("\n".join(self._rows))
+        elif self._table_depth:
+            if tag in ("td", "th") and self._cell is not None and self._row is not None:
+                self._row.append(" ".join("".join(self._cell).split()))
+                self._cell = None
+            elif tag == "tr" and self._row is not None:
+                self._rows.append(" | ".join(self._row))
+                self._row = None
+        elif tag in self.BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._table_depth:
+            if self._cell is not None:
+                self._cell.append(data)
+        else:
+            self._text.append(data)
+
+    def _flush(self):
+        text = " ".join("".join(self._text).split())
+        if text:
+            self.paragraphs.append(text)
+        self._text = []
+
+    def close(self):
+        super().close()
+        self._flush()
+
+def extract_html(file_path: str) -> Dict[str, Any]:
+    parser = _HTMLTextExtractor()
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        parser.feed(f.read())
+    parser.close()
+    return {
+        "texts": chunk_paragraphs(parser.paragraphs),
+        "tables": parser.tables,
+        "images_info": [{"image_id": i + 1} for i in range(parser.images)],
+        "pages": None
+    }
+
+def extract_txt(file_path: str) -> Dict[str, Any]:
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        paragraphs = f.read().split("\n\n")
+    return {"texts": chunk_paragraphs(paragraphs), "tables": [], "images_info": [], "pages": None}
+
+EXTRACTORS = {
+    ".pdf": extract_pdf,
+    ".docx": extract_docx,
+    ".html": extract_html,
+    ".txt": extract_txt,
+}
+
+def quick_extract_document(file_path: str) -> Dict[str, Any]:
+    """Extract text, tables and image info without any model inference"""
+    file_ext = Path(file_path).suffix.lower()
+    extractor = EXTRACTORS.get(file_ext)
+    if extractor is None:
+        raise ValueError(f"Unsupported file format: {file_ext}")
+
+    started = time.perf_counter()
+    result = extractor(file_path)
+    result["extraction_seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+def benchmark(file_path: str, repeat: int = 3):
+    """Compare quick extraction with the element extraction stage of /analyze"""
+    quick_times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        quick = quick_extract_document(file_path)
+        quick_times.append(time.perf_counter() - started)
+
+    # Imported here so the quick path itself never loads unstructured
+    from main import extract_document_elements
+
+    started = time.perf_counter()
+    full = extract_document_elements(file_path)
+    full_time = time.perf_counter() - started
+
+    quick_best = min(quick_times)
+    print(f"Document: {file_path}")
+    print(f"Quick extract:  {quick_best * 1000:9.1f} ms ({len(quick['texts'])} text chunks, {len(quick['tables'])} tables)")
+    print(f"/analyze stage: {full_time * 1000:9.1f} ms ({len(full['texts'])} text chunks, {len(full['tables'])} tables)")
+    print(f"Speedup: {full_time / quick_best:.0f}x (excluding LLM summarization)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark quick extraction against the full /analyze extraction")
+    parser.add_argument("file")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.file, args.repeat)
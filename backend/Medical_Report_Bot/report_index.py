@@ -0,0 +1,213 @@
+"""Persistent retrieval index over analyzed reports for question answering.
+
+Every analyzed chunk is indexed twice: its summary is embedded into the Chroma collection
+and the original chunk (text or table HTML) goes into a SQLite docstore under the same
+doc_id. The MultiVectorRetriever matches questions against summaries and returns the
+originals. Both stores persist across restarts, and documents are keyed by the SHA-256 of
+the uploaded file and indexed only once, so follow-up questions about a report never
+re-parse or re-summarize it.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+
+try:
+    from langchain_core.stores import BaseStore
+except ImportError:
+    from langchain.schema.storage import BaseStore
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.schema.document import Document
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "64"))
+QA_TOP_K = int(os.getenv("QA_TOP_K", "4"))
+ID_KEY = "doc_id"
+
+QA_PROMPT = ChatPromptTemplate.from_template("""
+        You are a medical document analyst. Answer the question using only the excerpts
+        from the patient's medical documents below. If the excerpts do not contain the
+        answer, say so. Quote values with their units.
+
+        Excerpts:
+        {context}
+
+        Question: {question}
+
+        Answer:
+        """)
+
+class SQLiteDocStore(BaseStore[str, Document]):
+    """Docstore for the MultiVectorRetriever persisted in a local SQLite file
+
+    Besides the chunk documents it records which uploaded documents have been indexed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, filename TEXT, chunks INTEGER NOT NULL, indexed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[Document]]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = list(keys[start:start + 500])
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT key, value FROM chunks WHERE key IN ({placeholders})", batch
+                ).fetchall())
+        documents = []
+        for key in keys:
+            if key in found:
+                value = json.loads(found[key])
+                documents.append(Document(page_content=value["page_content"], metadata=value["metadata"]))
+            else:
+                documents.append(None)
+        return documents
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, Document]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (key, value) VALUES (?, ?)",
+                [
+                    (key, json.dumps({"page_content": document.page_content, "metadata": document.metadata}))
+                    for key, document in key_value_pairs
+                ]
+            )
+            self._conn.commit()
+
+    def mdelete(self, keys: Sequence[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE key = ?", [(key,) for key in keys])
+            self._conn.commit()
+
+    def yield_keys(self, prefix: Optional[str] = None) -> Iterator[str]:
+        with self._lock:
+            if prefix:
+                rows = self._conn.execute(
+                    "SELECT key FROM chunks WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT key FROM chunks").fetchall()
+        for (key,) in rows:
+            yield key
+
+    def record_document(self, document_id: str, filename: str, chunks: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (document_id, filename, chunks, indexed_at) VALUES (?, ?, ?, ?)",
+                (document_id, filename, chunks, time.time())
+            )
+            self._conn.commit()
+
+    def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document_id, filename, chunks, indexed_at FROM documents WHERE document_id = ?",
+                (document_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("document_id", "filename", "chunks", "indexed_at"), row))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (documents,) = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()
+            (chunks,) = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()
+        return {"documents": documents, "chunks": chunks}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def index_report(vectorstore, docstore: SQLiteDocStore, document_id: str, filename: str,
+                 entries: List[Dict[str, Any]], batch_size: int = INDEX_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Index the chunks of one analyzed document.
+
+    entries holds one dict per chunk with kind ("text" or "table"), index, original and
+    summary (None if summarization failed, in which case the original is embedded).
+    Summaries are embedded batch_size at a time. Documents already in the index are skipped.
+    """
+    existing = docstore.get_document(document_id)
+    if existing is not None:
+        return {"document_id": document_id, "indexed_chunks": existing["chunks"], "already_indexed": True, "seconds": 0.0}
+
+    started = time.perf_counter()
+    for start in range(0, len(entries), batch_size):
+        batch = entries[start:start + batch_size]
+        ids = [f"{document_id}:{entry['kind']}:{entry['index']}" for entry in batch]
+        metadata = [
+            {ID_KEY: doc_id, "document_id": document_id, "filename": filename, "kind": entry["kind"], "index": entry["index"]}
+            for doc_id, entry in zip(ids, batch)
+        ]
+        # Deterministic ids make a re-run after an interrupted indexing overwrite rather than duplicate
+        vectorstore.add_documents(
+            [Document(page_content=entry["summary"] or entry["original"], metadata=meta) for entry, meta in zip(batch, metadata)],
+            ids=ids
+        )
+        docstore.mset([
+            (doc_id, Document(page_content=entry["original"], metadata=meta))
+            for doc_id, entry, meta in zip(ids, batch, metadata)
+        ])
+
+    docstore.record_document(document_id, filename, len(entries))
+    seconds = time.perf_counter() - started
+    logger.info(f"Indexed {len(entries)} chunks of {filename} in {seconds:.2f}s")
+    return {
+        "document_id": document_id,
+        "indexed_chunks": len(entries),
+        "already_indexed": False,
+        "seconds": round(seconds, 3),
+        "chunks_per_second": round(len(entries) / seconds, 1) if seconds else None
+    }
+
+def retrieve_chunks(vectorstore, docstore: SQLiteDocStore, question: str,
+                    document_id: str, k: int = QA_TOP_K) -> List[Document]:
+    """Original chunks of one document whose summaries best match the question"""
+    try:
+        from langchain_community.retrievers.multi_vector import MultiVectorRetriever
+    except ImportError:
+        from langchain.retrievers.multi_vector import MultiVectorRetriever
+
+    if not document_id:
+        raise ValueError("Retrieval is always scoped to one document")
+    search_kwargs = {"k": k, "filter": {"document_id": document_id}}
+    retriever = MultiVectorRetriever(
+        vectorstore=vectorstore,
+        docstore=docstore,
+        id_key=ID_KEY,
+        search_kwargs=search_kwargs
+    )
+    return retriever.invoke(question)
+
+async def answer_question(llm, chunks: List[Document], question: str) -> str:
+    """Answer a question from retrieved chunks"""
+    context = "\n\n".join(
+        f"[{chunk.metadata.get('filename')} - {chunk.metadata.get('kind')} {chunk.metadata.get('index')}]\n{chunk.page_content}"
+        for chunk in chunks
+    )
+    chain = QA_PROMPT | llm | StrOutputParser()
+    return await chain.ainvoke({"context": context, "question": question})
@@ -0,0 +1,274 @@
+"""Concurrent LLM summarization for extracted document chunks.
+
+Summaries run as asyncio tasks behind a semaphore so at most MAX_CONCURRENCY requests
+are in flight. Each request is retried with exponential backoff, and the whole document
+is bounded by DOCUMENT_TIMEOUT. A failed or timed-out chunk only loses its own summary.
+
+Small chunks are packed into shared requests up to PACK_TOKEN_BUDGET estimated tokens,
+using a multi-section prompt whose answer is split back per chunk. If a packed answer
+cannot be parsed, its chunks fall back to one request each.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.getenv("SUMMARY_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("SUMMARY_RETRY_BASE_DELAY", "1.0"))
+DOCUMENT_TIMEOUT = float(os.getenv("SUMMARY_DOCUMENT_TIMEOUT", "300"))
+PACK_TOKEN_BUDGET = int(os.getenv("SUMMARY_PACK_TOKEN_BUDGET", "3000"))  # 0 disables packing
+PACK_MAX_CHUNKS = int(os.getenv("SUMMARY_PACK_MAX_CHUNKS", "8"))
+
+TEXT_PROMPT_TEMPLATE = """
+        You are a medical document analyst. Summarize the following text content from a medical document.
+        Focus on key medical information, diagnoses, treatments, and important findings.
+
+        Text content: {element}
+
+        Provide a concise but comprehensive summary:
+        """
+TEXT_PROMPT = ChatPromptTemplate.from_template(TEXT_PROMPT_TEMPLATE)
+
+MULTI_PROMPT_TEMPLATE = """
+        You are a medical document analyst. Below are {count} sections of a medical document,
+        each starting with a line "### SECTION <n>". Summarize every section separately.
+        Focus on key medical information, diagnoses, treatments, and important findings.
+
+        Answer with exactly {count} concise but comprehensive summaries, in order. Start each
+        with a line "### SUMMARY <n>" matching its section number and write nothing else.
+
+        {sections}
+        """
+MULTI_PROMPT = ChatPromptTemplate.from_template(MULTI_PROMPT_TEMPLATE)
+
+_SUMMARY_HEADER = re.compile(r"^[ \t]*#{2,}[ \t]*SUMMARY[ \t]+(\d+)[ \t#:]*$", re.MULTILINE | re.IGNORECASE)
+
+def model_name(model) -> str:
+    """Identify a chat model for cache keys"""
+    return getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+
+def build_summary_chain(model):
+    """Build the chunk summarization chain around a chat model"""
+    return {"element": lambda x: x} | TEXT_PROMPT | model | StrOutputParser()
+
+def build_multi_summary_chain(model):
+    """Build the packed (several chunks per request) summarization chain"""
+    return MULTI_PROMPT | model | StrOutputParser()
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)"""
+    return len(text) // 4 + 1
+
+def pack_chunks(contents: List[str], token_budget: int = PACK_TOKEN_BUDGET,
+                max_chunks: int = PACK_MAX_CHUNKS) -> List[List[int]]:
+    """Group consecutive chunk indices into packs of at most token_budget estimated tokens"""
+    packs, current, tokens = [], [], 0
+    for index, content in enumerate(contents):
+        size = estimate_tokens(content)
+        if current and (tokens + size > token_budget or len(current) >= max_chunks):
+            packs.append(current)
+            current, tokens = [], 0
+        current.append(index)
+        tokens += size
+    if current:
+        packs.append(current)
+    return packs
+
+def format_sections(contents: List[str]) -> Dict[str, Any]:
+    sections = "\n\n".join(f"### SECTION {n}\n{content}" for n, content in enumerate(contents, start=1))
+    return {"count": len(contents), "sections": sections}
+
+def parse_multi_summary(answer: str, count: int) -> List[str]:
+    """Split a packed answer into one summary per section; ValueError if any is missing"""
+    headers = list(_SUMMARY_HEADER.finditer(answer))
+    summaries = {}
+    for header, following in zip(headers, headers[1:] + [None]):
+        end = following.start() if following else len(answer)
+        summaries[int(header.group(1))] = answer[header.end():end].strip()
+    missing = [n for n in range(1, count + 1) if not summaries.get(n)]
+    if missing:
+        raise ValueError(f"Packed answer is missing summaries for sections {missing}")
+    return [summaries[n] for n in range(1, count + 1)]
+
+async def summarize_one(chain, content: str, semaphore: asyncio.Semaphore,
+                        max_retries: int = MAX_RETRIES, base_delay: float = RETRY_BASE_DELAY) -> str:
+    """Summarize a single chunk, retrying with exponential backoff"""
+    async with semaphore:
+        for attempt in range(max_retries + 1):
+            try:
+                return await chain.ainvoke(content)
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                delay = base_delay * (2 ** attempt)
+                logger.warning(f"Summary attempt {attempt + 1} failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+async def summarize_all(chain, contents: List[str],
+                        max_concurrency: int = MAX_CONCURRENCY,
+                        max_retries: int = MAX_RETRIES,
+                        base_delay: float = RETRY_BASE_DELAY,
+                        timeout: float = DOCUMENT_TIMEOUT,
+                        on_result: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None,
+                        multi_chain=None,
+                        token_budget: int = PACK_TOKEN_BUDGET,
+                        stats: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Summarize every chunk of a document with bounded concurrency.
+
+    Returns one entry per input, in input order: {"summary": str, "packed": bool} on success
+    (packed tells whether MULTI_PROMPT produced it), {"error": str} if the chunk failed after
+    all retries or the document timed out.
+    If given, on_result(index, entry) is awaited as each chunk finishes.
+    With a multi_chain and a positive token_budget, chunks are packed into shared requests.
+    stats, if given, is filled with llm_requests, packed_requests and pack_fallbacks.
+    """
+    counts = {"llm_requests": 0, "packed_requests": 0, "pack_fallbacks": 0}
+    if stats is not None:
+        stats.update(counts)
+    if not contents:
+        return []
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(contents)
+    if multi_chain is not None and token_budget > 0:
+        packs = pack_chunks(contents, token_budget)
+    else:
+        packs = [[i] for i in range(len(contents))]
+
+    async def finish(index: int, result: Dict[str, Any]):
+        results[index] = result
+        if on_result is not None:
+            await on_result(index, result)
+
+    async def run_single(index: int):
+        counts["llm_requests"] += 1
+        try:
+            result = {"summary": await summarize_one(chain, contents[index], semaphore, max_retries, base_delay), "packed": False}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            result = {"error": str(e)}
+        await finish(index, result)
+
+    async def run_pack(pack: List[int]):
+        if len(pack) == 1:
+            await run_single(pack[0])
+            return
+        counts["llm_requests"] += 1
+        counts["packed_requests"] += 1
+        try:
+            answer = await summarize_one(
+                multi_chain, format_sections([contents[i] for i in pack]), semaphore, max_retries, base_delay
+            )
+            summaries = parse_multi_summary(answer, len(pack))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Packed summary of {len(pack)} chunks failed ({e}), falling back to per-chunk requests")
+            counts["pack_fallbacks"] += 1
+            await asyncio.gather(*(run_single(i) for i in pack))
+            return
+        for index, summary in zip(pack, summaries):
+            await finish(index, {"summary": summary, "packed": True})
+
+    tasks = [asyncio.ensure_future(run_pack(pack)) for pack in packs]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning(f"Summarization timed out after {timeout}s with {sum(r is None for r in results)} chunks pending")
+    if stats is not None:
+        stats.update(counts)
+
+    return [
+        result if result is not None else {"error": f"Summary timed out after {timeout}s"}
+        for result in results
+    ]
+
+def make_standin_llm(latency: float = 0.5, failure_rate: float = 0.0, seed: int = None):
+    """
+    Local stand-in for the Groq chat model, for offline testing and benchmarking.
+
+    Waits `latency` seconds per call, fails a `failure_rate` fraction of calls,
+    and answers with the tail of the prompt (of each section, for packed prompts).
+    """
+    rng = random.Random(seed)
+
+    def respond(prompt):
+        if rng.random() < failure_rate:
+            raise RuntimeError("Stand-in LLM simulated failure")
+        text = prompt.to_string().strip()
+        sections = re.split(r"^[ \t]*### SECTION (\d+)[ \t]*$", text, flags=re.MULTILINE)
+        if len(sections) > 1:
+            return "\n".join(
+                f"### SUMMARY {number}\nSummary: {body.strip()[-200:]}"
+                for number, body in zip(sections[1::2], sections[2::2])
+            )
+        return "Summary: " + text[-200:]
+
+    def invoke(prompt):
+        time.sleep(latency)
+        return respond(prompt)
+
+    async def ainvoke(prompt):
+        await asyncio.sleep(latency)
+        return respond(prompt)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+def benchmark(chunks: int = 30, latency: float = 0.5, concurrency: int = MAX_CONCURRENCY, failure_rate: float = 0.0):
+    """Compare serial, concurrent and packed summarization against the stand-in LLM"""
+    llm = make_standin_llm(latency, failure_rate, seed=0)
+    chain = build_summary_chain(llm)
+    contents = [f"Chunk {i}: HbA1c 7.{i % 10}% fasting glucose {100 + i} mg/dL" for i in range(chunks)]
+
+    start = time.perf_counter()
+    for content in contents:
+        try:
+            chain.invoke(content)
+        except Exception:
+            pass
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = asyncio.run(summarize_all(chain, contents, max_concurrency=concurrency, base_delay=0.05))
+    concurrent = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = {}
+    packed_results = asyncio.run(summarize_all(
+        chain, contents, max_concurrency=concurrency, base_delay=0.05,
+        multi_chain=build_multi_summary_chain(llm), stats=stats
+    ))
+    packed = time.perf_counter() - start
+
+    failed = sum(1 for result in results if "error" in result)
+    packed_failed = sum(1 for result in packed_results if "error" in result)
+    print(f"Chunks: {chunks}, simulated latency: {latency}s, concurrency: {concurrency}")
+    print(f"Serial:     {serial:.2f}s")
+    print(f"Concurrent: {concurrent:.2f}s ({serial / concurrent:.1f}x faster, {failed} failed)")
+    print(f"Packed:     {packed:.2f}s ({serial / packed:.1f}x faster, {stats['llm_requests']} requests, "
+          f"{stats['pack_fallbacks']} fallbacks, {packed_failed} failed)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark summarization against a local stand-in LLM")
+    parser.add_argument("--chunks", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    benchmark(args.chunks, args.latency, args.concurrency, args.failure_rate)
@@ -0,0 +1,102 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from lab_extraction import extract_document_lab_values, extract_lab_values, html_table_to_lines
+
+def values(text):
+    return [(r["analyte"], r["value"], r["unit"], r["flag"]) for r in extract_lab_values(text)]
+
+@pytest.mark.parametrize("line", [
+    "LDL/HDL ratio 3.2",
+    "LDL / HDL Ratio 2.9",
+    "Total Cholesterol/HDL Ratio 4.5",
+    "TOTAL CHOLESTEROL / HDL RATIO 5.1",
+    "Chol/HDL 4.1",
+    "LDL : HDL Ratio 3.2",
+])
+def test_ratios_are_not_analyte_values(line):
+    assert values(line) == []
+
+@pytest.mark.parametrize("line, expected", [
+    ("Glucose (Fasting) 126 mg/dL", ("fasting_glucose", 126.0, "mg/dL", "high")),
+    ("Glucose(Fasting) 92 mg/dL", ("fasting_glucose", 92.0, "mg/dL", "normal")),
+    ("Plasma Glucose, Fasting 110 mg/dL", ("fasting_glucose", 110.0, "mg/dL", "high")),
+    ("Fasting Blood Glucose 95 mg/dL (70-100)", ("fasting_glucose", 95.0, "mg/dL", "normal")),
+    ("Glucose (Random) 7.8 mmol/L", ("random_glucose", 7.8, "mmol/L", "high")),
+    ("Blood Glucose 180 mg/dL", ("glucose", 180.0, "mg/dL", "high")),
+    ("Blood Sugar 98 mg/dL", ("glucose", 98.0, "mg/dL", "normal")),
+])
+def test_glucose_formats(line, expected):
+    assert values(line) == [expected]
+
+def test_ratio_lines_next_to_real_values():
+    report = "\n".join([
+        "LDL Cholesterol 130 mg/dL 0 - 100",
+        "HDL Cholesterol 45 mg/dL 40 - 60",
+        "LDL/HDL ratio 2.9",
+        "Total Cholesterol/HDL Ratio 4.5",
+    ])
+    assert values(report) == [("ldl", 130.0, "mg/dL", "high"), ("hdl", 45.0, "mg/dL", "normal")]
+
+def test_urine_glucose_is_skipped():
+    assert values("Urine Glucose 0") == []
+
+def test_table_rows():
+    table = (
+        "<table><tr><th>Test</th><th>Result</th><th>Unit</th><th>Reference</th></tr>"
+        "<tr><td>HbA1c</td><td>7.2</td><td>%</td><td>4.0-5.6</td></tr>"
+        "<tr><td>Glucose (Fasting)</td><td>126</td><td>mg/dL</td><td>70-100</td></tr>"
+        "<tr><td>Chol/HDL Ratio</td><td>4.5</td><td></td><td>&lt; 5</td></tr></table>"
+    )
+    assert "Glucose (Fasting) | 126 | mg/dL | 70-100 |" in html_table_to_lines(table)
+    results = extract_document_lab_values([], [table])
+    assert [(r["analyte"], r["value"], r["flag"]) for r in results] == [
+        ("hba1c", 7.2, "high"), ("fasting_glucose", 126.0, "high")
+    ]
+
+@pytest.mark.parametrize("line, flag", [
+    ("Glucose 5.5 mmol/L (3.9-5.5)", "normal"),
+    ("Glucose 3.9 mmol/L (3.9-5.5)", "normal"),
+    ("Glucose 5.6 mmol/L (3.9-5.5)", "high"),
+    ("Glucose 3.8 mmol/L (3.9-5.5)", "low"),
+    ("Fasting Glucose 5.6 mmol/L", "high"),
+    ("HDL Cholesterol 1.03 mmol/L (1.03-1.55)", "normal"),
+    ("Creatinine 110 umol/L (62-110)", "normal"),
+])
+def test_flags_at_range_boundaries_in_reported_units(line, flag):
+    assert [r["flag"] for r in extract_lab_values(line)] == [flag]
+
+@pytest.mark.parametrize("line, expected", [
+    ("Glucose 1,200 mg/dL", ("glucose", 1200.0, "high")),
+    ("Triglycerides 1,250 mg/dL", ("triglycerides", 1250.0, "high")),
+    ("Triglycerides 1,250.5 mg/dL (0-150)", ("triglycerides", 1250.5, "high")),
+    ("HbA1c 7,2 % (4,0-5,6)", ("hba1c", 7.2, "high")),
+    ("Glucose 5,5 mmol/L (3,9-5,5)", ("glucose", 5.5, "normal")),
+])
+def test_decimal_and_thousands_commas(line, expected):
+    assert [(r["analyte"], r["value"], r["flag"]) for r in extract_lab_values(line)] == [expected]
+
+@pytest.mark.parametrize("text", [
+    "Check your glucose 2 times a day.",
+    "Glucose tolerance test 75 g given at 8 am.",
+    "Repeat HbA1c in 3 months.",
+    "Discussed LDL 2 weeks ago with the patient.",
+    "Creatinine was checked on 12 occasions.",
+])
+def test_prose_is_not_a_lab_result(text):
+    assert values(text) == []
+
+@pytest.mark.parametrize("text, expected", [
+    ("HbA1c 7.2 (4.0-5.6)", ("hba1c", 7.2, "%", "high")),
+    ("Glucose | 126 | | 70-100", ("glucose", 126.0, "mg/dL", "high")),
+])
+def test_unitless_results_with_range_or_table_context(text, expected):
+    assert values(text) == [expected]
+
+def test_unitless_value_in_table():
+    table = "<table><tr><td>Creatinine</td><td>1.1</td></tr></table>"
+    assert [(r["analyte"], r["unit"]) for r in extract_document_lab_values([], [table])] == [("creatinine", "mg/dL")]
@@ -0,0 +1,175 @@
+import math
+import time
+import numpy as np
+
+FRAME_WIDTH, FRAME_HEIGHT = 640, 480
+
+METRIC_NAMES = (
+    'left_ear',
+    'right_ear',
+    'avg_ear',
+    'mouth_ratio',
+    'face_ratio',
+    'face_width',
+    'face_length',
+    'lip_distance',
+    'jaw_width'
+)
+METRIC_INDEX = {name: i for i, name in enumerate(METRIC_NAMES)}
+
+# Landmark pairs whose distances feed the ratios, in FaceMesh landmark IDs.
+DISTANCE_PAIRS = (
+    (160, 144), (158, 153), (33, 133),     # left eye: vertical A, vertical B, horizontal C
+    (385, 380), (387, 373), (362, 263),    # right eye: vertical A, vertical B, horizontal C
+    (61, 405), (17, 307),                  # mouth width, mouth height
+    (1, 18), (116, 345),                   # face length, face width
+    (13, 14), (172, 397)                   # lip distance, jaw width
+)
+
+# Only these landmarks are read out of the 478-point mesh.
+LANDMARK_IDS = np.array(sorted({i for pair in DISTANCE_PAIRS for i in pair}))
+_LOCAL = {landmark_id: i for i, landmark_id in enumerate(LANDMARK_IDS)}
+_PAIR_A = np.array([_LOCAL[a] for a, _ in DISTANCE_PAIRS])
+_PAIR_B = np.array([_LOCAL[b] for _, b in DISTANCE_PAIRS])
+_SCALE = np.array([FRAME_WIDTH, FRAME_HEIGHT], dtype=np.float64)
+
+
+def _ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def landmarks_to_array(landmarks):
+    """Pixel coordinates of LANDMARK_IDS for one FaceMesh result, shape (len(LANDMARK_IDS), 2)."""
+    points = landmarks.landmark
+    coords = np.array([(points[i].x, points[i].y) for i in LANDMARK_IDS], dtype=np.float64)
+    # Truncate like the original int(x * w) pixel conversion so values match the per-point implementation.
+    return np.trunc(coords * _SCALE)
+
+
+def compute_metrics_batch(points):
+    """Compute every metric for a batch of frames.
+
+    points: array of shape (n_frames, len(LANDMARK_IDS), 2) from landmarks_to_array.
+    Returns an array of shape (n_frames, len(METRIC_NAMES)) with columns in METRIC_NAMES order.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim == 2:
+        points = points[np.newaxis]
+    d = np.linalg.norm(points[:, _PAIR_A] - points[:, _PAIR_B], axis=-1)
+
+    metrics = np.empty((points.shape[0], len(METRIC_NAMES)), dtype=np.float64)
+    metrics[:, 0] = _ratio(d[:, 0] + d[:, 1], 2.0 * d[:, 2])
+    metrics[:, 1] = _ratio(d[:, 3] + d[:, 4], 2.0 * d[:, 5])
+    metrics[:, 2] = (metrics[:, 0] + metrics[:, 1]) / 2
+    metrics[:, 3] = _ratio(d[:, 7], d[:, 6])
+    metrics[:, 4] = _ratio(d[:, 8], d[:, 9])
+    metrics[:, 5] = d[:, 9]
+    metrics[:, 6] = d[:, 8]
+    metrics[:, 7] = d[:, 10]
+    metrics[:, 8] = d[:, 11]
+    return metrics
+
+
+def extract_facial_metrics(landmarks, names=METRIC_NAMES):
+    """Metrics for a single FaceMesh result as a plain dict, restricted to names."""
+    row = compute_metrics_batch(landmarks_to_array(landmarks))[0]
+    return {name: float(row[METRIC_INDEX[name]]) for name in names}
+
+
+class MetricStore:
+    """Columnar per-frame metric storage for one task.
+
+    Rows live in a preallocated float array with METRIC_NAMES columns; capacity doubles
+    when full, so a long task costs a few reallocations instead of one dict per frame.
+    """
+
+    def __init__(self, capacity=256):
+        self._data = np.empty((capacity, len(METRIC_NAMES)), dtype=np.float64)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, rows):
+        needed = self._size + rows
+        if needed > len(self._data):
+            grown = np.empty((max(needed, 2 * len(self._data)), len(METRIC_NAMES)), dtype=np.float64)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+    def append(self, row):
+        self._reserve(1)
+        self._data[self._size] = row
+        self._size += 1
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(METRIC_NAMES))
+        self._reserve(len(rows))
+        self._data[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    @property
+    def data(self):
+        return self._data[:self._size]
+
+    def column(self, name):
+        return self.data[:, METRIC_INDEX[name]]
+
+    def means(self):
+        return dict(zip(METRIC_NAMES, self.data.mean(axis=0).tolist()))
+
+    def std(self, name):
+        return float(self.column(name).std()) if self._size else 0.0
+
+    def tension_increase(self):
+        """Mean absolute drift of face_ratio from the first recorded frame."""
+        if not self._size:
+            return 0.0
+        face_ratio = self.column('face_ratio')
+        return float(np.abs(face_ratio - face_ratio[0]).mean())
+
+
+def _reference_metrics(points):
+    # Original per-point implementation, kept only for the benchmark comparison.
+    p = {landmark_id: tuple(points[i]) for i, landmark_id in enumerate(LANDMARK_IDS)}
+    left_ear = (math.dist(p[160], p[144]) + math.dist(p[158], p[153])) / (2.0 * math.dist(p[33], p[133]))
+    right_ear = (math.dist(p[385], p[380]) + math.dist(p[387], p[373])) / (2.0 * math.dist(p[362], p[263]))
+    mouth_width = math.dist(p[61], p[405])
+    face_width = math.dist(p[116], p[345])
+    return {
+        'avg_ear': (left_ear + right_ear) / 2,
+        'mouth_ratio': math.dist(p[17], p[307]) / mouth_width if mouth_width > 0 else 0,
+        'face_ratio': math.dist(p[1], p[18]) / face_width if face_width > 0 else 0
+    }
+
+
+def benchmark(n_frames=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    points = np.trunc(rng.uniform(0, 1, (n_frames, len(LANDMARK_IDS), 2)) * _SCALE)
+
+    start = time.perf_counter()
+    for frame in points:
+        _reference_metrics(frame)
+    reference = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame in points:
+        compute_metrics_batch(frame)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = compute_metrics_batch(points)
+    batched = time.perf_counter() - start
+
+    expected = _reference_metrics(points[0])
+    for name, value in expected.items():
+        assert math.isclose(batch[0, METRIC_INDEX[name]], value, rel_tol=1e-9), name
+
+    print(f"Frames: {n_frames}")
+    print(f"math.dist per frame:   {reference / n_frames * 1e6:8.2f} us/frame")
+    print(f"NumPy per frame:       {single / n_frames * 1e6:8.2f} us/frame")
+    print(f"NumPy batched:         {batched / n_frames * 1e6:8.2f} us/frame")
+
+
+if __name__ == "__main__":
+    benchmark()
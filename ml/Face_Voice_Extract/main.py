@@ -1,7 +1,5 @@
 import cv2
 import mediapipe as mp
-import sounddevice as sd
-from scipy.io.wavfile import write
 import librosa
 import parselmouth
 import numpy as np
@@ -12,12 +10,27 @@ import time
 import queue
 import os
 import math
+import csv
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+import facial_metrics
+
+try:
+    import sounddevice as sd
+except (ImportError, OSError):
+    # Headless batch mode runs on servers without PortAudio
+    sd = None
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
 
 class DiabetesRiskAnalyzer:
-    def __init__(self):
-        self.root = tk.Tk()
-        self.root.title("Diabetes Risk Analysis - Voice & Face Biomarkers")
-        self.root.geometry("950x750")
+    def __init__(self, headless=False):
+        self.headless = headless
+        self.root = None
+        if not headless:
+            self.root = tk.Tk()
+            self.root.title("Diabetes Risk Analysis - Voice & Face Biomarkers")
+            self.root.geometry("950x750")
         
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
@@ -37,10 +50,16 @@ class DiabetesRiskAnalyzer:
         self.fs = 44100
         self.seconds = 15
         self.audio_data = None
-        self.facial_metrics = []
+        self.facial_metrics = {}
         self.voice_features = {}
         self.task_results = {}
+        self.pipeline_stats = {}
         self.breath_start_time = None
+        self.report_text = None
+        self.risk_summary = None
+        # Voice analysis for a finished task overlaps with recording the next one
+        self.audio_executor = ThreadPoolExecutor(max_workers=1)
+        self.pending_audio = {}
         
         self.tasks = [
             {
@@ -49,6 +68,7 @@ class DiabetesRiskAnalyzer:
                 "duration": 15,
                 "instruction": "Read this text clearly while maintaining steady facial position",
                 "type": "voice",
+                "sample_every": 3,
                 "description": "Analyzes voice patterns and facial tension for glucose response estimation"
             },
             {
@@ -57,6 +77,7 @@ class DiabetesRiskAnalyzer:
                 "duration": 12,
                 "instruction": "Read while simulating chewing motions - move your jaw and lips naturally",
                 "type": "voice_chewing",
+                "sample_every": 2,
                 "description": "Captures jaw and facial activity patterns linked to glucose metabolism"
             },
             {
@@ -65,6 +86,7 @@ class DiabetesRiskAnalyzer:
                 "duration": 60,
                 "instruction": "Hold breath as long as possible, keep face visible and steady",
                 "type": "breath",
+                "sample_every": 5,
                 "description": "Measures cardio-metabolic response via facial metrics during breath holding"
             }
         ]
@@ -100,7 +122,8 @@ class DiabetesRiskAnalyzer:
             }
         }
         
-        self.setup_ui()
+        if not headless:
+            self.setup_ui()
         
     def setup_ui(self):
         main_frame = ttk.Frame(self.root, padding="10")
@@ -276,16 +299,33 @@ class DiabetesRiskAnalyzer:
             sd.wait()
             
             if self.recording or not hasattr(self, 'start_time'):
-                filename = f"task_{self.current_task + 1}_audio.wav"
-                write(filename, self.fs, self.audio_data)
-                self.analyze_audio(filename)
+                task_key = f'task_{self.current_task + 1}'
+                samples = self.audio_data[:, 0].astype(np.float32)
+                self.pending_audio[task_key] = self.audio_executor.submit(self.analyze_audio_samples, samples, self.fs, task_key)
                 
         except Exception as e:
             print(f"Audio error: {str(e)}")
             
-    def analyze_audio(self, filename):
+    def wait_for_audio_analysis(self):
+        pending = [future for future in self.pending_audio.values() if not future.done()]
+        if pending:
+            if not self.headless:
+                self.status_label.config(text=f"Waiting for {len(pending)} voice analysis result(s)...")
+                self.root.update_idletasks()
+            wait(pending)
+        self.pending_audio.clear()
+            
+    def analyze_audio(self, filename, task_key=None):
         try:
             y, sr = librosa.load(filename, sr=None)
+        except Exception as e:
+            print(f"Audio analysis error: {str(e)}")
+            return
+        self.analyze_audio_samples(y, sr, task_key)
+            
+    def analyze_audio_samples(self, y, sr, task_key=None):
+        try:
+            task_key = task_key or f'task_{self.current_task + 1}'
             mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
             
             spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
@@ -293,7 +333,7 @@ class DiabetesRiskAnalyzer:
             zero_crossing_rate = librosa.feature.zero_crossing_rate(y)[0]
             spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)[0]
             
-            snd = parselmouth.Sound(filename)
+            snd = parselmouth.Sound(y.astype(np.float64), sampling_frequency=sr)
             pitch = snd.to_pitch()
             mean_pitch = parselmouth.praat.call(pitch, "Get mean", 0, 0, "Hertz")
             pitch_std = parselmouth.praat.call(pitch, "Get standard deviation", 0, 0, "Hertz")
@@ -319,280 +359,271 @@ class DiabetesRiskAnalyzer:
                 'hnr': hnr if not math.isnan(hnr) else 0
             }
             
-            self.voice_features[f'task_{self.current_task + 1}'] = task_features
-            
-            if os.path.exists(filename):
-                os.remove(filename)
+            self.voice_features[task_key] = task_features
                 
         except Exception as e:
             print(f"Audio analysis error: {str(e)}")
             
     def extract_facial_metrics(self, landmarks):
         try:
-            h, w = 480, 640
-            points = [(int(landmark.x * w), int(landmark.y * h)) for landmark in landmarks.landmark]
-            
-            left_eye = [points[33], points[160], points[158], points[133], points[153], points[144]]
-            right_eye = [points[362], points[385], points[387], points[263], points[373], points[380]]
-            
-            def eye_aspect_ratio(eye_points):
-                A = math.dist(eye_points[1], eye_points[5])
-                B = math.dist(eye_points[2], eye_points[4])
-                C = math.dist(eye_points[0], eye_points[3])
-                return (A + B) / (2.0 * C)
-                
-            left_ear = eye_aspect_ratio(left_eye)
-            right_ear = eye_aspect_ratio(right_eye)
-            
-            mouth_points = [points[61], points[84], points[17], points[314], points[405], points[320], points[307], points[375]]
-            mouth_width = math.dist(mouth_points[0], mouth_points[4])
-            mouth_height = math.dist(mouth_points[2], mouth_points[6])
-            mouth_ratio = mouth_height / mouth_width if mouth_width > 0 else 0
-            
-            upper_lip = points[13]
-            lower_lip = points[14]
-            lip_distance = math.dist(upper_lip, lower_lip)
-            
-            left_jaw = points[172]
-            right_jaw = points[397]
-            jaw_width = math.dist(left_jaw, right_jaw)
-            
-            nose_tip = points[1]
-            chin = points[18]
-            face_length = math.dist(nose_tip, chin)
-            
-            left_cheek = points[116]
-            right_cheek = points[345]
-            face_width = math.dist(left_cheek, right_cheek)
-            face_ratio = face_length / face_width if face_width > 0 else 0
-            
-            return {
-                'left_ear': left_ear,
-                'right_ear': right_ear,
-                'avg_ear': (left_ear + right_ear) / 2,
-                'mouth_ratio': mouth_ratio,
-                'face_ratio': face_ratio,
-                'face_width': face_width,
-                'face_length': face_length,
-                'lip_distance': lip_distance,
-                'jaw_width': jaw_width
-            }
+            return facial_metrics.extract_facial_metrics(landmarks)
             
         except Exception as e:
             print(f"Facial metrics error: {str(e)}")
             return {}
             
-    def process_video(self):
-        face_detected = False
-        frame_count = 0
-        task_facial_metrics = []
-        
-        while self.recording:
-            try:
-                ret, frame = self.cap.read()
-                if not ret:
-                    break
-                    
-                frame = cv2.flip(frame, 1)
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = self.face_mesh.process(rgb_frame)
-                
-                if results.multi_face_landmarks:
-                    face_detected = True
-                    for face_landmarks in results.multi_face_landmarks:
-                        self.mp_draw.draw_landmarks(
-                            frame, 
-                            face_landmarks, 
-                            self.mp_face_mesh.FACEMESH_TESSELATION,
-                            None,
-                            self.mp_drawing_styles.get_default_face_mesh_tesselation_style()
-                        )
-                        
-                        self.mp_draw.draw_landmarks(
-                            frame, 
-                            face_landmarks, 
-                            self.mp_face_mesh.FACEMESH_CONTOURS,
-                            None,
-                            self.mp_drawing_styles.get_default_face_mesh_contours_style()
-                        )
+    def extract_facial_metric_row(self, landmarks):
+        try:
+            return facial_metrics.compute_metrics_batch(facial_metrics.landmarks_to_array(landmarks))[0]
+            
+        except Exception as e:
+            print(f"Facial metrics error: {str(e)}")
+            return None
+            
+    def run_video_pipeline(self, is_active, stop, sample_every, on_metrics, overlay, window_name):
+        # Capture and landmark inference run on their own threads; this thread draws and displays.
+        # Stages are linked by single-slot queues where a newer frame replaces an unconsumed one,
+        # so a slow stage never holds back the camera or shows stale frames.
+        capture_queue = queue.Queue(maxsize=1)
+        render_queue = queue.Queue(maxsize=1)
+        done = threading.Event()
+        counts = {"captured": 0, "inferred": 0, "displayed": 0}
+        started = time.time()
+        
+        def put_latest(q, item):
+            while True:
+                try:
+                    q.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
                         
-                        if frame_count % 3 == 0:
-                            metrics = self.extract_facial_metrics(face_landmarks)
-                            if metrics:
-                                task_facial_metrics.append(metrics)
-                
-                status_text = "Voice & Face Analysis" if face_detected else "No Face Detected"
-                cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0) if face_detected else (0, 0, 255), 2)
-                
-                if hasattr(self, 'start_time'):
-                    elapsed = time.time() - self.start_time
-                    time_remaining = max(0, self.seconds - int(elapsed))
-                    cv2.putText(frame, f"Task {self.current_task + 1}: {time_remaining}s", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                
-                task_name = self.tasks[self.current_task]["name"]
-                cv2.putText(frame, "Glucose Estimation", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
-                
-                cv2.imshow("Diabetes Risk Analysis - Glucose Estimation", frame)
-                
-                if cv2.waitKey(1) & 0xFF == 27:
-                    self.recording = False
-                    break
-                    
-                frame_count += 1
-                    
+        def capture():
+            try:
+                while is_active() and not done.is_set():
+                    ret, frame = self.cap.read()
+                    if not ret:
+                        break
+                    counts["captured"] += 1
+                    put_latest(capture_queue, cv2.flip(frame, 1))
             except Exception as e:
-                print(f"Video processing error: {str(e)}")
-                break
+                print(f"Video capture error: {str(e)}")
+            finally:
+                done.set()
                 
-        if task_facial_metrics:
-            self.facial_metrics.append({
-                f'task_{self.current_task + 1}': task_facial_metrics
-            })
-            
-    def process_video_chewing(self):
-        face_detected = False
-        frame_count = 0
-        task_facial_metrics = []
-        jaw_positions = []
+        def infer():
+            while not done.is_set():
+                try:
+                    frame = capture_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                try:
+                    results = self.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    landmarks = results.multi_face_landmarks
+                    if landmarks and counts["inferred"] % sample_every == 0:
+                        metrics = self.extract_facial_metric_row(landmarks[0])
+                        if metrics is not None:
+                            on_metrics(metrics)
+                    counts["inferred"] += 1
+                    put_latest(render_queue, (frame, landmarks))
+                except Exception as e:
+                    print(f"Video processing error: {str(e)}")
+                    done.set()
+                    
+        capture_thread = threading.Thread(target=capture, daemon=True)
+        inference_thread = threading.Thread(target=infer, daemon=True)
+        capture_thread.start()
+        inference_thread.start()
         
-        while self.recording:
+        face_detected = False
+        while not done.is_set():
             try:
-                ret, frame = self.cap.read()
-                if not ret:
-                    break
-                    
-                frame = cv2.flip(frame, 1)
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = self.face_mesh.process(rgb_frame)
-                
-                if results.multi_face_landmarks:
-                    face_detected = True
-                    for face_landmarks in results.multi_face_landmarks:
-                        self.mp_draw.draw_landmarks(
-                            frame, 
-                            face_landmarks, 
-                            self.mp_face_mesh.FACEMESH_TESSELATION,
-                            None,
-                            self.mp_drawing_styles.get_default_face_mesh_tesselation_style()
-                        )
-                        
-                        self.mp_draw.draw_landmarks(
-                            frame, 
-                            face_landmarks, 
-                            self.mp_face_mesh.FACEMESH_CONTOURS,
-                            None,
-                            self.mp_drawing_styles.get_default_face_mesh_contours_style()
-                        )
-                        
-                        if frame_count % 2 == 0:
-                            metrics = self.extract_facial_metrics(face_landmarks)
-                            if metrics:
-                                task_facial_metrics.append(metrics)
-                                jaw_positions.append(metrics['jaw_width'])
+                frame, landmarks = render_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
                 
-                status_text = "Chewing Analysis" if face_detected else "No Face Detected"
-                cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0) if face_detected else (0, 0, 255), 2)
-                
-                if hasattr(self, 'start_time'):
-                    elapsed = time.time() - self.start_time
-                    time_remaining = max(0, self.seconds - int(elapsed))
-                    cv2.putText(frame, f"Task {self.current_task + 1}: {time_remaining}s", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                
-                cv2.putText(frame, "Simulate chewing while reading", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
-                
-                cv2.imshow("Diabetes Risk Analysis - Chewing Pattern", frame)
-                
-                if cv2.waitKey(1) & 0xFF == 27:
-                    self.recording = False
-                    break
+            if landmarks:
+                face_detected = True
+                for face_landmarks in landmarks:
+                    self.mp_draw.draw_landmarks(
+                        frame, 
+                        face_landmarks, 
+                        self.mp_face_mesh.FACEMESH_TESSELATION,
+                        None,
+                        self.mp_drawing_styles.get_default_face_mesh_tesselation_style()
+                    )
                     
-                frame_count += 1
+                    self.mp_draw.draw_landmarks(
+                        frame, 
+                        face_landmarks, 
+                        self.mp_face_mesh.FACEMESH_CONTOURS,
+                        None,
+                        self.mp_drawing_styles.get_default_face_mesh_contours_style()
+                    )
                     
-            except Exception as e:
-                print(f"Video processing error: {str(e)}")
+            overlay(frame, face_detected)
+            cv2.imshow(window_name, frame)
+            counts["displayed"] += 1
+            
+            if cv2.waitKey(1) & 0xFF == 27:
+                stop()
                 break
                 
-        if task_facial_metrics and jaw_positions:
-            jaw_movement_variability = np.std(jaw_positions) if len(jaw_positions) > 1 else 0
-            for metrics in task_facial_metrics:
-                metrics['jaw_movement_variability'] = jaw_movement_variability
+        done.set()
+        capture_thread.join()
+        inference_thread.join()
+        
+        elapsed = max(time.time() - started, 1e-6)
+        stats = {
+            "capture_fps": counts["captured"] / elapsed,
+            "inference_fps": counts["inferred"] / elapsed,
+            "display_fps": counts["displayed"] / elapsed
+        }
+        self.pipeline_stats[f'task_{self.current_task + 1}'] = stats
+        print(f"Task {self.current_task + 1} video pipeline: capture {stats['capture_fps']:.1f} FPS, "
+              f"inference {stats['inference_fps']:.1f} FPS, display {stats['display_fps']:.1f} FPS")
+        return stats
+        
+    def draw_task_timer(self, frame):
+        if hasattr(self, 'start_time'):
+            elapsed = time.time() - self.start_time
+            time_remaining = max(0, self.seconds - int(elapsed))
+            cv2.putText(frame, f"Task {self.current_task + 1}: {time_remaining}s", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            
+    def stop_recording(self):
+        self.recording = False
+        
+    def stop_breath_hold(self):
+        self.breath_holding = False
+            
+    def process_video(self):
+        task_facial_metrics = facial_metrics.MetricStore()
+        
+        def overlay(frame, face_detected):
+            status_text = "Voice & Face Analysis" if face_detected else "No Face Detected"
+            cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0) if face_detected else (0, 0, 255), 2)
+            self.draw_task_timer(frame)
+            cv2.putText(frame, "Glucose Estimation", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
             
-            self.facial_metrics.append({
-                f'task_{self.current_task + 1}': task_facial_metrics
-            })
+        self.run_video_pipeline(
+            lambda: self.recording, self.stop_recording, self.tasks[self.current_task]["sample_every"],
+            task_facial_metrics.append, overlay, "Diabetes Risk Analysis - Glucose Estimation"
+        )
+        self.store_task_metrics(task_facial_metrics)
+            
+    def process_video_chewing(self):
+        task_facial_metrics = facial_metrics.MetricStore()
+        
+        def overlay(frame, face_detected):
+            status_text = "Chewing Analysis" if face_detected else "No Face Detected"
+            cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0) if face_detected else (0, 0, 255), 2)
+            self.draw_task_timer(frame)
+            cv2.putText(frame, "Simulate chewing while reading", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+            
+        self.run_video_pipeline(
+            lambda: self.recording, self.stop_recording, self.tasks[self.current_task]["sample_every"],
+            task_facial_metrics.append, overlay, "Diabetes Risk Analysis - Chewing Pattern"
+        )
+        self.store_task_metrics(task_facial_metrics)
             
     def process_video_breath(self):
-        face_detected = False
+        task_facial_metrics = facial_metrics.MetricStore()
+        
+        def overlay(frame, face_detected):
+            status_text = "Breath Hold Analysis" if face_detected else "No Face Detected"
+            cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0) if face_detected else (0, 0, 255), 2)
+            if self.breath_start_time:
+                elapsed = time.time() - self.breath_start_time
+                cv2.putText(frame, f"Breath Hold: {int(elapsed)}s", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            cv2.putText(frame, "Click 'Finished Breath Hold' when done", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+            
+        self.run_video_pipeline(
+            lambda: self.breath_holding, self.stop_breath_hold, self.tasks[self.current_task]["sample_every"],
+            task_facial_metrics.append, overlay, "Diabetes Risk Analysis - Breath Hold Test"
+        )
+        self.store_task_metrics(task_facial_metrics)
+        
+    def store_task_metrics(self, task_facial_metrics):
+        if len(task_facial_metrics):
+            self.facial_metrics[f'task_{self.current_task + 1}'] = task_facial_metrics
+            
+    def summarize_task_metrics(self, task_key):
+        # Per-task aggregates, shared by the live and headless paths, as vectorized column reductions
+        store = self.facial_metrics.get(task_key)
+        if store is None or not len(store):
+            return None
+            
+        summary = store.means()
+        summary['ear_variability'] = store.std('avg_ear')
+        summary['jaw_movement_variability'] = store.std('jaw_width')
+        summary['face_tension_increase'] = store.tension_increase()
+        return summary
+        
+    def analyze_recorded_video(self, video_path):
+        # Headless counterpart of the live video pipeline: every frame of a recording, no display.
+        # Returns the recording duration in seconds.
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError(f"Cannot open video {video_path}")
+            
+        sample_every = self.tasks[self.current_task]["sample_every"]
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
         frame_count = 0
-        task_facial_metrics = []
-        initial_metrics = None
-        
-        while self.breath_holding:
-            try:
-                ret, frame = self.cap.read()
+        sampled_points = []
+        task_facial_metrics = facial_metrics.MetricStore()
+        try:
+            while True:
+                ret, frame = cap.read()
                 if not ret:
                     break
                     
-                frame = cv2.flip(frame, 1)
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = self.face_mesh.process(rgb_frame)
-                
-                if results.multi_face_landmarks:
-                    face_detected = True
-                    for face_landmarks in results.multi_face_landmarks:
-                        self.mp_draw.draw_landmarks(
-                            frame, 
-                            face_landmarks, 
-                            self.mp_face_mesh.FACEMESH_TESSELATION,
-                            None,
-                            self.mp_drawing_styles.get_default_face_mesh_tesselation_style()
-                        )
-                        
-                        self.mp_draw.draw_landmarks(
-                            frame, 
-                            face_landmarks, 
-                            self.mp_face_mesh.FACEMESH_CONTOURS,
-                            None,
-                            self.mp_drawing_styles.get_default_face_mesh_contours_style()
-                        )
-                        
-                        if frame_count % 5 == 0:
-                            metrics = self.extract_facial_metrics(face_landmarks)
-                            if metrics:
-                                if initial_metrics is None:
-                                    initial_metrics = metrics.copy()
-                                
-                                face_tension_increase = abs(metrics['face_ratio'] - initial_metrics['face_ratio'])
-                                metrics['face_tension_increase'] = face_tension_increase
-                                task_facial_metrics.append(metrics)
-                
-                status_text = "Breath Hold Analysis" if face_detected else "No Face Detected"
-                cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0) if face_detected else (0, 0, 255), 2)
-                
-                if self.breath_start_time:
-                    elapsed = time.time() - self.breath_start_time
-                    cv2.putText(frame, f"Breath Hold: {int(elapsed)}s", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                
-                cv2.putText(frame, "Click 'Finished Breath Hold' when done", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
-                
-                cv2.imshow("Diabetes Risk Analysis - Breath Hold Test", frame)
-                
-                if cv2.waitKey(1) & 0xFF == 27:
-                    self.breath_holding = False
-                    break
-                    
+                results = self.face_mesh.process(cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB))
+                if results.multi_face_landmarks and frame_count % sample_every == 0:
+                    sampled_points.append(facial_metrics.landmarks_to_array(results.multi_face_landmarks[0]))
                 frame_count += 1
+        finally:
+            cap.release()
+            
+        if sampled_points:
+            task_facial_metrics.extend(facial_metrics.compute_metrics_batch(np.stack(sampled_points)))
+            self.store_task_metrics(task_facial_metrics)
+        return frame_count / fps
+        
+    def analyze_session(self, session_dir):
+        # A session directory holds task_<n>.<video ext> and, for voice tasks, task_<n>.wav
+        for task_index, task in enumerate(self.tasks):
+            self.current_task = task_index
+            prefix = os.path.join(session_dir, f"task_{task_index + 1}")
+            
+            video_path = next((prefix + ext for ext in VIDEO_EXTENSIONS if os.path.exists(prefix + ext)), None)
+            if video_path:
+                duration = self.analyze_recorded_video(video_path)
+                if task["type"] == "breath":
+                    self.task_results[f'task_{task_index + 1}'] = {'breath_duration': duration}
                     
-            except Exception as e:
-                print(f"Video processing error: {str(e)}")
-                break
+            if task["type"] in ["voice", "voice_chewing"] and os.path.exists(prefix + ".wav"):
+                self.analyze_audio(prefix + ".wav")
                 
-        if task_facial_metrics:
-            self.facial_metrics.append({
-                f'task_{self.current_task + 1}': task_facial_metrics
-            })
+        self.calculate_diabetes_risk()
+        
+        row = {"session": os.path.basename(os.path.normpath(session_dir))}
+        row.update(self.risk_summary or {})
+        for task_key, features in self.voice_features.items():
+            for key in ['pitch_mean', 'jitter', 'shimmer', 'hnr', 'spectral_centroid']:
+                row[f"{task_key}_{key}"] = features[key]
+        for task_key in self.facial_metrics:
+            summary = self.summarize_task_metrics(task_key)
+            for key in ['avg_ear', 'face_ratio', 'mouth_ratio']:
+                row[f"{task_key}_{key}"] = summary[key]
+        for task_key, result in self.task_results.items():
+            row[f"{task_key}_breath_duration"] = result['breath_duration']
+        return row
             
     def calculate_diabetes_risk(self):
+        self.wait_for_audio_analysis()
         try:
             results = f"""COMPREHENSIVE DIABETES RISK ANALYSIS REPORT
 {'='*70}
@@ -626,37 +657,30 @@ BIOMARKER ASSESSMENT BY TASK:
                             overall_risk += 3
                             risk_indicators.append("Reduced breath hold capacity indicating cardio-metabolic stress")
                         
-                        for task_data in self.facial_metrics:
-                            if f'task_{task_num}' in task_data:
-                                metrics_list = task_data[f'task_{task_num}']
-                                if metrics_list:
-                                    avg_metrics = {
-                                        key: np.mean([m.get(key, 0) for m in metrics_list]) 
-                                        for key in metrics_list[0].keys()
-                                    }
-                                    ear_values = [m.get('avg_ear', 0) for m in metrics_list]
-                                    ear_variability = np.std(ear_values)
-                                    
-                                    results += f"Average Eye Aspect Ratio: {avg_metrics['avg_ear']:.3f}\n"
-                                    results += f"Diabetic Baseline: {baseline['avg_ear']:.3f}\n"
-                                    results += f"Face Ratio: {avg_metrics['face_ratio']:.3f}\n"
-                                    results += f"Diabetic Baseline: {baseline['face_ratio']:.3f}\n"
-                                    results += f"Eye Variability: {ear_variability:.3f}\n"
-                                    results += f"Diabetic Baseline: {baseline['ear_variability']:.3f}\n"
-                                    results += f"Face Tension Increase: {avg_metrics.get('face_tension_increase', 0):.3f}\n"
-                                    results += f"Diabetic Baseline: {baseline['face_tension_increase']:.3f}\n"
-                                    
-                                    if avg_metrics['avg_ear'] <= baseline['avg_ear']:
-                                        overall_risk += 2
-                                        risk_indicators.append("Reduced eye opening during breath hold")
-                                    
-                                    if avg_metrics['face_ratio'] >= baseline['face_ratio']:
-                                        overall_risk += 2
-                                        risk_indicators.append("Altered facial proportions under metabolic stress")
-                                    
-                                    if ear_variability >= baseline['ear_variability']:
-                                        overall_risk += 2
-                                        risk_indicators.append("High eye movement variability during breath hold")
+                        avg_metrics = self.summarize_task_metrics(f'task_{task_num}')
+                        if avg_metrics:
+                            ear_variability = avg_metrics['ear_variability']
+                            
+                            results += f"Average Eye Aspect Ratio: {avg_metrics['avg_ear']:.3f}\n"
+                            results += f"Diabetic Baseline: {baseline['avg_ear']:.3f}\n"
+                            results += f"Face Ratio: {avg_metrics['face_ratio']:.3f}\n"
+                            results += f"Diabetic Baseline: {baseline['face_ratio']:.3f}\n"
+                            results += f"Eye Variability: {ear_variability:.3f}\n"
+                            results += f"Diabetic Baseline: {baseline['ear_variability']:.3f}\n"
+                            results += f"Face Tension Increase: {avg_metrics.get('face_tension_increase', 0):.3f}\n"
+                            results += f"Diabetic Baseline: {baseline['face_tension_increase']:.3f}\n"
+                            
+                            if avg_metrics['avg_ear'] <= baseline['avg_ear']:
+                                overall_risk += 2
+                                risk_indicators.append("Reduced eye opening during breath hold")
+                            
+                            if avg_metrics['face_ratio'] >= baseline['face_ratio']:
+                                overall_risk += 2
+                                risk_indicators.append("Altered facial proportions under metabolic stress")
+                            
+                            if ear_variability >= baseline['ear_variability']:
+                                overall_risk += 2
+                                risk_indicators.append("High eye movement variability during breath hold")
                 else:
                     if f'task_{task_num}' in self.voice_features:
                         features = self.voice_features[f'task_{task_num}']
@@ -689,43 +713,36 @@ BIOMARKER ASSESSMENT BY TASK:
                             overall_risk += 2
                             risk_indicators.append(f"Reduced voice quality in {task_descriptions[i]}")
                     
-                    for task_data in self.facial_metrics:
-                        if f'task_{task_num}' in task_data:
-                            metrics_list = task_data[f'task_{task_num}']
-                            if metrics_list:
-                                avg_metrics = {
-                                    key: np.mean([m.get(key, 0) for m in metrics_list]) 
-                                    for key in metrics_list[0].keys()
-                                }
-                                
-                                results += f"FACIAL BIOMARKERS:\n"
-                                results += f"Eye Aspect Ratio: {avg_metrics['avg_ear']:.3f}\n"
-                                results += f"Diabetic Baseline: {baseline['avg_ear']:.3f}\n"
-                                results += f"Face Ratio: {avg_metrics['face_ratio']:.3f}\n"
-                                results += f"Diabetic Baseline: {baseline['face_ratio']:.3f}\n"
-                                results += f"Mouth Mobility Ratio: {avg_metrics['mouth_ratio']:.3f}\n"
-                                results += f"Diabetic Baseline: {baseline['mouth_ratio']:.3f}\n"
-                                
-                                if task_name == "chewing_pattern":
-                                    jaw_var = avg_metrics.get('jaw_movement_variability', 0)
-                                    results += f"Jaw Movement Variability: {jaw_var:.3f}\n"
-                                    results += f"Diabetic Baseline: {baseline['jaw_movement_variability']:.3f}\n"
-                                    
-                                    if jaw_var >= baseline['jaw_movement_variability']:
-                                        overall_risk += 2
-                                        risk_indicators.append("Irregular chewing patterns linked to glucose metabolism")
-                                
-                                if avg_metrics['avg_ear'] <= baseline['avg_ear']:
-                                    overall_risk += 1
-                                    risk_indicators.append(f"Reduced eye opening in {task_descriptions[i]}")
-                                
-                                if avg_metrics['face_ratio'] >= baseline['face_ratio']:
-                                    overall_risk += 1
-                                    risk_indicators.append(f"Altered facial proportions in {task_descriptions[i]}")
-                                
-                                if avg_metrics['mouth_ratio'] <= baseline['mouth_ratio']:
-                                    overall_risk += 1
-                                    risk_indicators.append(f"Reduced mouth mobility in {task_descriptions[i]}")
+                    avg_metrics = self.summarize_task_metrics(f'task_{task_num}')
+                    if avg_metrics:
+                        results += f"FACIAL BIOMARKERS:\n"
+                        results += f"Eye Aspect Ratio: {avg_metrics['avg_ear']:.3f}\n"
+                        results += f"Diabetic Baseline: {baseline['avg_ear']:.3f}\n"
+                        results += f"Face Ratio: {avg_metrics['face_ratio']:.3f}\n"
+                        results += f"Diabetic Baseline: {baseline['face_ratio']:.3f}\n"
+                        results += f"Mouth Mobility Ratio: {avg_metrics['mouth_ratio']:.3f}\n"
+                        results += f"Diabetic Baseline: {baseline['mouth_ratio']:.3f}\n"
+                        
+                        if task_name == "chewing_pattern":
+                            jaw_var = avg_metrics.get('jaw_movement_variability', 0)
+                            results += f"Jaw Movement Variability: {jaw_var:.3f}\n"
+                            results += f"Diabetic Baseline: {baseline['jaw_movement_variability']:.3f}\n"
+                            
+                            if jaw_var >= baseline['jaw_movement_variability']:
+                                overall_risk += 2
+                                risk_indicators.append("Irregular chewing patterns linked to glucose metabolism")
+                        
+                        if avg_metrics['avg_ear'] <= baseline['avg_ear']:
+                            overall_risk += 1
+                            risk_indicators.append(f"Reduced eye opening in {task_descriptions[i]}")
+                        
+                        if avg_metrics['face_ratio'] >= baseline['face_ratio']:
+                            overall_risk += 1
+                            risk_indicators.append(f"Altered facial proportions in {task_descriptions[i]}")
+                        
+                        if avg_metrics['mouth_ratio'] <= baseline['mouth_ratio']:
+                            overall_risk += 1
+                            risk_indicators.append(f"Reduced mouth mobility in {task_descriptions[i]}")
             
             risk_level = "LOW"
             if overall_risk >= 18:
@@ -790,7 +807,9 @@ BIOMARKER ASSESSMENT BY TASK:
             results += f"Voice Analysis Completed: {len(self.voice_features)}/2 tasks\n"
             results += f"Facial Analysis Completed: {len(self.facial_metrics)}/{len(self.tasks)} tasks\n"
             results += f"Breath Analysis Completed: {'Yes' if any('task_3' in str(data) for data in self.task_results.values()) else 'No'}\n"
-            results += f"Total Biomarkers Analyzed: {sum(len(features) for features in self.voice_features.values()) + sum(len(metrics[list(metrics.keys())[0]]) if metrics else 0 for metrics in self.facial_metrics)}\n"
+            for task_key, stats in self.pipeline_stats.items():
+                results += f"Video Pipeline {task_key}: capture {stats['capture_fps']:.1f} FPS, inference {stats['inference_fps']:.1f} FPS\n"
+            results += f"Total Biomarkers Analyzed: {sum(len(features) for features in self.voice_features.values()) + sum(len(store) for store in self.facial_metrics.values())}\n"
             
             results += f"\nREPORT GENERATED:\n"
             results += f"{'-'*20}\n"
@@ -807,13 +826,22 @@ BIOMARKER ASSESSMENT BY TASK:
             results += "and other clinical factors. This tool is designed for screening purposes\n"
             results += "and early detection support only.\n"
             
+            self.risk_summary = {
+                "risk_score": overall_risk,
+                "risk_level": risk_level,
+                "risk_indicators": "; ".join(risk_indicators)
+            }
             self.update_results(results)
-            self.calculate_risk_button.config(state="disabled")
+            if not self.headless:
+                self.calculate_risk_button.config(state="disabled")
             
         except Exception as e:
             self.update_results(f"Risk calculation error: {str(e)}")
             
     def update_results(self, text):
+        self.report_text = text
+        if self.headless:
+            return
         self.results_text.delete(1.0, tk.END)
         self.results_text.insert(1.0, text)
         
@@ -830,8 +858,51 @@ BIOMARKER ASSESSMENT BY TASK:
         if self.cap:
             self.cap.release()
         cv2.destroyAllWindows()
+        self.audio_executor.shutdown(wait=False, cancel_futures=True)
         self.root.destroy()
 
+def analyze_session_headless(session_dir):
+    try:
+        return DiabetesRiskAnalyzer(headless=True).analyze_session(session_dir)
+    except Exception as e:
+        return {"session": os.path.basename(os.path.normpath(session_dir)), "error": str(e)}
+
+def run_batch(sessions_root, output_path, workers=None):
+    session_dirs = sorted(
+        os.path.join(sessions_root, name) for name in os.listdir(sessions_root)
+        if os.path.isdir(os.path.join(sessions_root, name))
+    )
+    rows = []
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(analyze_session_headless, session_dir) for session_dir in session_dirs]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            print(f"[{len(rows)}/{len(session_dirs)}] {row['session']}: {row.get('risk_level', row.get('error'))}")
+            
+    rows.sort(key=lambda row: row["session"])
+    columns = ["session", "risk_score", "risk_level"]
+    columns += sorted({key for row in rows for key in row} - set(columns) - {"risk_indicators", "error"})
+    columns += ["risk_indicators", "error"]
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+        
+    elapsed = time.time() - start
+    print(f"Processed {len(rows)} sessions in {elapsed:.1f}s -> {output_path}")
+    return rows
+
 if __name__ == "__main__":
-    app = DiabetesRiskAnalyzer()
-    app.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Diabetes Risk Analysis - Voice & Face Biomarkers")
+    parser.add_argument("--batch", metavar="SESSIONS_DIR", help="Analyze every recorded session directory headlessly")
+    parser.add_argument("--output", default="batch_results.csv", help="Results table written in batch mode")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel worker processes (default: CPU count)")
+    args = parser.parse_args()
+    
+    if args.batch:
+        run_batch(args.batch, args.output, args.workers)
+    else:
+        app = DiabetesRiskAnalyzer()
+        app.run()
\ No newline at end of file